@@ -1,52 +1,33 @@
-import psycopg2
 import pandas as pd
+from backends import connect, list_tables, count_columns
 
-def analyze_database_tables(db_name, db_config):
+def analyze_database_tables(db_name):
     """
-    Analiza todas las tablas en una base de datos PostgreSQL y retorna sus conteos
+    Analiza todas las tablas en una base de datos del warehouse y retorna sus conteos
     
     Args:
-        db_name (str): Nombre de la base de datos
-        db_config (dict): Configuración de conexión a la base de datos
+        db_name (str): Nombre de la base de datos (el motor se elige con DW_BACKEND)
         
     Returns:
         list: Lista de diccionarios con información de cada tabla
     """
-    # Creamos la conexión a PostgreSQL
-    conn = psycopg2.connect(
-        database=db_name,
-        user=db_config['user'],
-        password=db_config['password'],
-        host=db_config['host'],
-        port=db_config['port']
-    )
+    # Creamos la conexión (PostgreSQL, SQLite o DuckDB según DW_BACKEND)
+    conn = connect(db_name, create=False)
     cursor = conn.cursor()
     
     # Obtenemos todas las tablas de la base de datos
-    cursor.execute("""
-        SELECT table_name 
-        FROM information_schema.tables 
-        WHERE table_schema = 'public'
-    """)
-    tables = cursor.fetchall()
+    tables = list_tables(conn)
     
     table_stats = []
     
-    for table in tables:
-        table_name = table[0]
+    for table_name in tables:
         
         # Contamos registros
         cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
         count = cursor.fetchone()[0]
         
         # Obtenemos información de columnas
-        cursor.execute("""
-            SELECT COUNT(*) 
-            FROM information_schema.columns 
-            WHERE table_schema = 'public' 
-            AND table_name = %s
-        """, (table_name,))
-        num_columns = cursor.fetchone()[0]
+        num_columns = count_columns(conn, table_name)
         
         # Guardamos estadísticas
         table_stats.append({
@@ -93,14 +74,6 @@ def print_database_summary(stats):
             print(f"    Columnas: {row['column_count']}")
 
 def main():
-    # Configuración de la base de datos
-    DB_CONFIG = {
-        'user': 'postgres',
-        'password': '1234',
-        'host': 'localhost',
-        'port': '5433'
-    }
-    
     # Definimos las bases de datos a analizar
     databases = ['crashDW', 'vehicleDW']
     
@@ -108,7 +81,7 @@ def main():
     all_stats = []
     for db_name in databases:
         try:
-            stats = analyze_database_tables(db_name, DB_CONFIG)
+            stats = analyze_database_tables(db_name)
             all_stats.extend(stats)
         except Exception as e:
             print(f"Error al analizar {db_name}: {str(e)}")
@@ -0,0 +1,186 @@
+import hashlib
+import json
+import os
+import re
+import sys
+import unicodedata
+
+import pandas as pd
+
+from backends import DW_BACKEND, connect, database_location
+
+# Las consultas se leen directamente de la documentación
+QUERIES_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                            '..', 'docs', 'analytitcalQueries.md')
+
+# Resultados cacheados en disco:
+#   <CACHE_DIR>/<backend>/<database>/<location hash>/<load_id>_<hash>.pkl
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.query_cache')
+
+# Tablas exclusivas del VehicleDW; el resto de consultas van al CrashDW
+VEHICLE_TABLES = ['DimDateTime_Veh', 'DimLocation_Veh', 'DimDriver', 'DimVehicle',
+                  'DimJunk_Veh', 'FactVehicleInvolment']
+
+QUERY_HEADER = re.compile(r'^### (\d+)\. (.+?)$(.*?)```sql\n(.*?)```', re.MULTILINE | re.DOTALL)
+
+
+def slugify(text):
+    """Converts a query title into a name: lowercase ASCII words joined by '_'"""
+    text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii')
+    return re.sub(r'[^a-z0-9]+', '_', text.lower()).strip('_')
+
+
+def load_queries(path=QUERIES_PATH):
+    """
+    Parses the numbered '### N. Title' sections of the analytical queries document.
+    Returns a dict name -> {'number', 'title', 'sql', 'database'}, in document order.
+    """
+    with open(path, encoding='utf-8') as f:
+        text = f.read()
+
+    queries = {}
+    for number, title, _, sql in QUERY_HEADER.findall(text):
+        database = 'vehicleDW' if any(table in sql for table in VEHICLE_TABLES) else 'crashDW'
+        queries[slugify(title)] = {
+            'number': int(number),
+            'title': title.strip(),
+            'sql': sql.strip().rstrip(';'),
+            'database': database
+        }
+    return queries
+
+
+# --------------------------------------------------------------------
+# Caché de resultados
+#    - La clave incluye la consulta, los parámetros, la ubicación de la
+#      base (archivo o servidor) y el load_id de su última carga
+#      (etl_load_generation, uno aleatorio por carga: sigue siendo único
+#      aunque la base se reconstruya y el contador vuelva a empezar).
+#    - Al cambiar el load_id, las entradas anteriores se descartan.
+#    - Mientras una carga está en curso (o si falló) la base no tiene
+#      load_id: sus lotes ya son visibles pero la carga no terminó, así
+#      que las consultas van siempre a la base y no se cachean.
+# --------------------------------------------------------------------
+cache_stats = {'hits': 0, 'misses': 0}
+connections = {}
+
+
+def get_connection(database):
+    """Returns an open connection to database, reusing it across queries"""
+    if database not in connections:
+        connections[database] = connect(database, create=False)
+    return connections[database]
+
+
+def close_connections():
+    for conn in connections.values():
+        conn.close()
+    connections.clear()
+
+
+def get_load_id(conn):
+    """Returns the load_id of the last completed load of a database (None while a load runs)"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT load_id FROM etl_load_generation WHERE id = 1")
+    result = cursor.fetchone()
+    conn.commit()
+    return result[0] if result else None
+
+
+def cache_dir(database):
+    """Cache directory of a database, separated by backend and location"""
+    location = hashlib.sha256(database_location(database).encode('utf-8')).hexdigest()[:16]
+    return os.path.join(CACHE_DIR, DW_BACKEND, database, location)
+
+
+def cache_key(query, params):
+    """Hash of the SQL text and its parameters"""
+    payload = json.dumps([query['sql'], params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()[:32]
+
+
+def prune_cache(db_dir, load_id):
+    """Deletes the cached results of earlier loads of a database"""
+    for filename in os.listdir(db_dir):
+        if filename.endswith('.pkl') and not filename.startswith(f"{load_id}_"):
+            os.remove(os.path.join(db_dir, filename))
+
+
+def record_cache_access(hit):
+    """Counts a hit or miss for this session and in the persistent stats file"""
+    cache_stats['hits' if hit else 'misses'] += 1
+
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    stats_path = os.path.join(CACHE_DIR, 'stats.json')
+    totals = {'hits': 0, 'misses': 0}
+    if os.path.exists(stats_path):
+        with open(stats_path) as f:
+            totals = json.load(f)
+    totals['hits' if hit else 'misses'] += 1
+    with open(stats_path, 'w') as f:
+        json.dump(totals, f)
+
+
+def run_query(name, params=None, use_cache=True, queries=None):
+    """
+    Runs a named analytical query and returns its result as a DataFrame.
+    With use_cache, a result computed for the same query, parameters, database
+    location and load is read from disk instead of querying the database. The
+    cache is bypassed while the database is being loaded.
+    """
+    queries = queries or load_queries()
+    query = queries[name]
+    conn = get_connection(query['database'])
+
+    load_id = get_load_id(conn)
+    use_cache = use_cache and load_id is not None
+    db_dir = cache_dir(query['database'])
+    path = os.path.join(db_dir, f"{load_id}_{cache_key(query, params)}.pkl")
+
+    if use_cache and os.path.exists(path):
+        record_cache_access(hit=True)
+        return pd.read_pickle(path)
+
+    cursor = conn.cursor()
+    cursor.execute(query['sql'], params)
+    column_names = [desc[0] for desc in cursor.description]
+    result = pd.DataFrame(cursor.fetchall(), columns=column_names)
+    conn.commit()
+
+    if use_cache:
+        record_cache_access(hit=False)
+        os.makedirs(db_dir, exist_ok=True)
+        prune_cache(db_dir, load_id)
+        result.to_pickle(path)
+    return result
+
+
+def print_cache_report():
+    """Prints the hit rate of this session and the cumulative one"""
+    def rate(stats):
+        total = stats['hits'] + stats['misses']
+        return f"{stats['hits']}/{total} hits ({stats['hits'] / total:.1%})" if total else "no queries"
+
+    print("\n=== CACHE DE CONSULTAS ===")
+    print(f"  Sesión: {rate(cache_stats)}")
+    stats_path = os.path.join(CACHE_DIR, 'stats.json')
+    if os.path.exists(stats_path):
+        with open(stats_path) as f:
+            print(f"  Acumulado: {rate(json.load(f))}")
+
+
+def main():
+    queries = load_queries()
+    # Uso: python analytical_queries.py [nombre ...]  (sin argumentos: todas)
+    names = sys.argv[1:] or list(queries)
+
+    for name in names:
+        query = queries[name]
+        print(f"\n=== {query['number']}. {query['title']} ({query['database']}) ===")
+        print(run_query(name, queries=queries).to_string(index=False))
+
+    close_connections()
+    print_cache_report()
+
+if __name__ == "__main__":
+    main()
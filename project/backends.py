@@ -0,0 +1,379 @@
+import os
+import re
+
+import numpy as np
+
+try:
+    import psycopg2
+    from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+except ImportError:
+    psycopg2 = None
+
+try:
+    import duckdb
+except ImportError:
+    duckdb = None
+
+import sqlite3
+
+# --------------------------------------------------------------------
+# Configuración del backend de almacenamiento
+#    - postgres: servidor PostgreSQL (DB_CONFIG, variables DW_PG_*)
+#    - sqlite:   un archivo <dbname>.sqlite por esquema en DW_DATA_DIR
+#    - duckdb:   un archivo columnar <dbname>.duckdb por esquema en DW_DATA_DIR
+#    Se elige con las variables de entorno DW_BACKEND y DW_DATA_DIR.
+# --------------------------------------------------------------------
+DW_BACKEND = os.environ.get('DW_BACKEND', 'postgres')
+DW_DATA_DIR = os.environ.get('DW_DATA_DIR', 'warehouse')
+
+# Database configuration (PostgreSQL server), from DW_PG_USER, DW_PG_PASSWORD,
+# DW_PG_HOST and DW_PG_PORT. Without DW_PG_PASSWORD, libpq falls back to
+# PGPASSWORD or ~/.pgpass
+DB_CONFIG = {
+    'user': os.environ.get('DW_PG_USER', 'postgres'),
+    'password': os.environ.get('DW_PG_PASSWORD'),
+    'host': os.environ.get('DW_PG_HOST', 'localhost'),
+    'port': os.environ.get('DW_PG_PORT', '5433')
+}
+
+BACKENDS = ['postgres', 'sqlite', 'duckdb']
+
+
+def create_database_if_not_exists(dbname, user, password, host, port):
+    """
+    Creates a PostgreSQL database if it doesn't exist.
+    Returns True if database was created, False if it already existed.
+    """
+    # Connect to PostgreSQL server to check/create database
+    conn = psycopg2.connect(
+        database="postgres",  # Connect to default postgres database first
+        user=user,
+        password=password,
+        host=host,
+        port=port
+    )
+    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+    cursor = conn.cursor()
+
+    # Check if database exists
+    cursor.execute("SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s", (dbname,))
+    exists = cursor.fetchone()
+
+    if not exists:
+        try:
+            cursor.execute(f'CREATE DATABASE "{dbname}"')
+            print(f"Database {dbname} created successfully")
+            created = True
+        except Exception as e:
+            print(f"Error creating database {dbname}: {str(e)}")
+            raise
+    else:
+        print(f"Database {dbname} already exists")
+        created = False
+
+    cursor.close()
+    conn.close()
+    return created
+
+def get_db_connection(dbname, user, password, host, port):
+    """
+    Creates a connection to the specified database.
+    Creates the database if it doesn't exist.
+    """
+    try:
+        # First ensure database exists
+        create_database_if_not_exists(dbname, user, password, host, port)
+
+        # Connect to the specified database
+        conn = psycopg2.connect(
+            database=dbname,
+            user=user,
+            password=password,
+            host=host,
+            port=port
+        )
+        print(f"Successfully connected to database {dbname}")
+        return conn
+
+    except Exception as e:
+        print(f"Error connecting to database {dbname}: {str(e)}")
+        raise
+
+
+def backend_of(conn):
+    """Returns the backend name of a connection returned by connect()"""
+    return getattr(conn, 'backend', 'postgres')
+
+
+def connect(dbname, backend=None, create=True):
+    """
+    Opens a connection to one of the warehouse databases on the configured backend.
+
+    Postgres connections are plain psycopg2 connections. SQLite and DuckDB connections
+    are wrapped so the same SQL (psycopg2 '%s' placeholders, SERIAL keys) runs unchanged.
+    With create=False a missing database is an error instead of being created.
+    """
+    backend = backend or DW_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend {backend!r}, expected one of {BACKENDS}")
+
+    if backend == 'postgres':
+        if psycopg2 is None:
+            raise ImportError("psycopg2 is required for the postgres backend")
+        if create:
+            return get_db_connection(dbname, **DB_CONFIG)
+        return psycopg2.connect(database=dbname, **DB_CONFIG)
+
+    path = os.path.join(DW_DATA_DIR, f"{dbname}.{backend}")
+    if not create and not os.path.exists(path):
+        raise FileNotFoundError(f"Database file {path} does not exist")
+    os.makedirs(DW_DATA_DIR, exist_ok=True)
+
+    if backend == 'sqlite':
+        # Autocommit mode: transactions are opened explicitly by LocalConnection
+        raw = sqlite3.connect(path, isolation_level=None)
+        raw.execute("PRAGMA foreign_keys = ON")
+    else:
+        if duckdb is None:
+            raise ImportError("duckdb is required for the duckdb backend")
+        raw = duckdb.connect(path)
+    print(f"Successfully connected to {backend} database {path}")
+    return LocalConnection(raw, backend)
+
+
+def database_location(dbname, backend=None):
+    """
+    Returns where a warehouse database lives: the absolute path of its file for
+    the embedded engines, a postgres:// URL (without password) for PostgreSQL.
+    """
+    backend = backend or DW_BACKEND
+    if backend == 'postgres':
+        return f"postgres://{DB_CONFIG['user']}@{DB_CONFIG['host']}:{DB_CONFIG['port']}/{dbname}"
+    return os.path.abspath(os.path.join(DW_DATA_DIR, f"{dbname}.{backend}"))
+
+
+# --------------------------------------------------------------------
+# Adaptación de SQL para los motores embebidos
+# --------------------------------------------------------------------
+SERIAL_COLUMN = re.compile(r'(\w+) SERIAL PRIMARY KEY')
+CREATE_TABLE = re.compile(r'CREATE TABLE IF NOT EXISTS (\w+)', re.IGNORECASE)
+NAMED_PLACEHOLDER = re.compile(r'%\((\w+)\)s')
+
+
+def translate_sql(sql, backend):
+    """
+    Rewrites PostgreSQL-flavoured SQL for sqlite/duckdb.
+    Returns (statements_to_run_first, translated_sql).
+    """
+    setup = []
+    serial = SERIAL_COLUMN.search(sql)
+    if serial:
+        if backend == 'sqlite':
+            sql = SERIAL_COLUMN.sub(r'\1 INTEGER PRIMARY KEY AUTOINCREMENT', sql)
+        else:
+            # DuckDB has no SERIAL: back the key with a sequence
+            sequence = f"{CREATE_TABLE.search(sql).group(1)}_{serial.group(1)}_seq".lower()
+            setup.append(f"CREATE SEQUENCE IF NOT EXISTS {sequence}")
+            sql = SERIAL_COLUMN.sub(rf"\1 INTEGER PRIMARY KEY DEFAULT nextval('{sequence}')", sql)
+
+    named = ':\\1' if backend == 'sqlite' else '$\\1'
+    sql = NAMED_PLACEHOLDER.sub(named, sql).replace('%s', '?').replace('%%', '%')
+    return setup, sql
+
+
+def adapt_params(params):
+    """Converts numpy scalars to Python values, which sqlite3/duckdb cannot bind"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: value.item() if isinstance(value, np.generic) else value
+                for key, value in params.items()}
+    return [value.item() if isinstance(value, np.generic) else value for value in params]
+
+
+class LocalConnection:
+    """
+    DB-API style wrapper over a sqlite3 or duckdb connection with psycopg2 semantics:
+    statements run inside a transaction until commit() or rollback().
+    """
+
+    def __init__(self, raw, backend):
+        self.raw = raw
+        self.backend = backend
+        self.in_transaction = False
+
+    def begin(self):
+        if not self.in_transaction:
+            self.raw.execute("BEGIN TRANSACTION")
+            self.in_transaction = True
+
+    def cursor(self):
+        return LocalCursor(self)
+
+    def commit(self):
+        if self.in_transaction:
+            self.raw.execute("COMMIT")
+            self.in_transaction = False
+
+    def rollback(self):
+        if self.in_transaction:
+            self.raw.execute("ROLLBACK")
+            self.in_transaction = False
+
+    def close(self):
+        self.rollback()
+        self.raw.close()
+
+
+class LocalCursor:
+    """Cursor of a LocalConnection; translates each statement before running it"""
+
+    def __init__(self, conn):
+        self.conn = conn
+        # DuckDB cursors are separate connections (with their own transactions),
+        # so statements run on the connection itself
+        self.cursor = conn.raw.cursor() if conn.backend == 'sqlite' else conn.raw
+
+    @property
+    def description(self):
+        return self.cursor.description
+
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+
+    def execute(self, sql, params=None):
+        setup, sql = translate_sql(sql, self.conn.backend)
+        self.conn.begin()
+        for statement in setup:
+            self.cursor.execute(statement)
+        if params is None:
+            self.cursor.execute(sql)
+        else:
+            self.cursor.execute(sql, adapt_params(params))
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        setup, sql = translate_sql(sql, self.conn.backend)
+        self.conn.begin()
+        for statement in setup:
+            self.cursor.execute(statement)
+        self.cursor.executemany(sql, [adapt_params(params) for params in seq_of_params])
+        return self
+
+    def fetchone(self):
+        return self.cursor.fetchone()
+
+    def fetchall(self):
+        return self.cursor.fetchall()
+
+    def close(self):
+        if self.conn.backend == 'sqlite':
+            self.cursor.close()
+
+
+def bulk_insert(cursor, table, columns, rows, page_size=10000):
+    """
+    Inserts many rows with one statement per page (psycopg2 execute_values)
+    or executemany on the embedded engines.
+    """
+    column_list = ', '.join(columns)
+    rows = [adapt_params(row) for row in rows]
+    if not rows:
+        # DuckDB's executemany rejects an empty parameter list
+        return
+    if isinstance(cursor, LocalCursor):
+        placeholders = ', '.join(['%s'] * len(columns))
+        cursor.executemany(f"INSERT INTO {table}({column_list}) VALUES ({placeholders})", rows)
+    else:
+        from psycopg2.extras import execute_values
+        execute_values(cursor, f"INSERT INTO {table}({column_list}) VALUES %s", rows,
+                       page_size=page_size)
+
+
+def list_tables(conn):
+    """Returns the names of the user tables of a warehouse database"""
+    cursor = conn.cursor()
+    if backend_of(conn) == 'sqlite':
+        cursor.execute("""
+            SELECT name FROM sqlite_master
+            WHERE type = 'table' AND name NOT LIKE 'sqlite_%%'
+        """)
+    else:
+        cursor.execute("""
+            SELECT table_name
+            FROM information_schema.tables
+            WHERE table_schema = %s
+        """, ('main' if backend_of(conn) == 'duckdb' else 'public',))
+    return [row[0] for row in cursor.fetchall()]
+
+
+def list_columns(conn, table_name):
+    """Returns the column names of a table in lowercase (empty if the table does not exist)"""
+    cursor = conn.cursor()
+    if backend_of(conn) == 'sqlite':
+        cursor.execute("SELECT name FROM pragma_table_info(%s)", (table_name,))
+    else:
+        cursor.execute("""
+            SELECT column_name
+            FROM information_schema.columns
+            WHERE table_schema = %s
+            AND lower(table_name) = lower(%s)
+        """, ('main' if backend_of(conn) == 'duckdb' else 'public', table_name))
+    return [row[0].lower() for row in cursor.fetchall()]
+
+
+def count_columns(conn, table_name):
+    """Returns the number of columns of a table"""
+    cursor = conn.cursor()
+    if backend_of(conn) == 'sqlite':
+        cursor.execute(f"SELECT * FROM {table_name} LIMIT 0")
+        return len(cursor.description)
+    cursor.execute("""
+        SELECT COUNT(*)
+        FROM information_schema.columns
+        WHERE table_schema = %s
+        AND table_name = %s
+    """, ('main' if backend_of(conn) == 'duckdb' else 'public', table_name))
+    return cursor.fetchone()[0]
+
+
+def list_index_columns(conn):
+    """
+    Returns {table: set of columns} with the leading column of every index and
+    primary key of a warehouse database (table and column names in lowercase).
+    """
+    cursor = conn.cursor()
+    backend = backend_of(conn)
+    if backend == 'sqlite':
+        cursor.execute("""
+            SELECT m.name, ii.name
+            FROM sqlite_master AS m
+            JOIN pragma_index_list(m.name) AS il
+            JOIN pragma_index_info(il.name) AS ii
+            WHERE m.type = 'table' AND ii.seqno = 0
+            UNION
+            SELECT m.name, ti.name
+            FROM sqlite_master AS m
+            JOIN pragma_table_info(m.name) AS ti
+            WHERE m.type = 'table' AND ti.pk = 1
+        """)
+        rows = cursor.fetchall()
+    elif backend == 'duckdb':
+        cursor.execute("SELECT table_name, expressions FROM duckdb_indexes()")
+        rows = [(table, expressions.strip('[]').split(',')[0]) for table, expressions in cursor.fetchall()]
+        cursor.execute("""
+            SELECT table_name, constraint_column_names[1]
+            FROM duckdb_constraints()
+            WHERE constraint_type IN ('PRIMARY KEY', 'UNIQUE')
+        """)
+        rows += cursor.fetchall()
+    else:
+        cursor.execute("SELECT tablename, indexdef FROM pg_indexes WHERE schemaname = 'public'")
+        rows = [(table, re.search(r'\(([^,)]+)', indexdef).group(1))
+                for table, indexdef in cursor.fetchall()]
+
+    indexed = {}
+    for table, column in rows:
+        indexed.setdefault(table.lower(), set()).add(column.strip().strip('"').lower())
+    return indexed
@@ -0,0 +1,156 @@
+from itertools import combinations
+
+import pandas as pd
+
+# --------------------------------------------------------------------
+# Cubo OLAP pre-agregado sobre FactCrash
+#    - Dimensiones: atributos usados en las consultas analíticas.
+#    - Medidas: conteo de accidentes, lesiones, fatalidades y vehículos.
+#    - Se materializan el total, cada dimensión, cada par y cada trío de
+#      dimensiones (a lo sumo unos miles de filas cada uno), así que un
+#      roll-up o slice de hasta tres atributos, por ejemplo dos dimensiones
+#      y un filtro, lee un conjunto pequeño.
+#    - El nivel más fino (todas las dimensiones), casi tan grande como
+#      FactCrash, solo se usa para cuatro o más atributos.
+#    - Los hechos sin fecha (u otra clave) se conservan con LEFT JOIN: su
+#      dimensión queda NULL, que grouping_id distingue de un roll-up.
+# --------------------------------------------------------------------
+CUBE_DIMENSIONS = {
+    'year': 'dt.year',
+    'month': 'dt.month',
+    'day_of_week': 'dt.day_of_week',
+    'weather': 'c.weather',
+    'collision_type': 'ct.collision_type',
+    'municipality': 'l.municipality',
+    'route_type': 'l.route_type',
+}
+
+CUBE_GROUPING_SETS = (
+    [()]
+    + [(name,) for name in CUBE_DIMENSIONS]
+    + list(combinations(CUBE_DIMENSIONS, 2))
+    + list(combinations(CUBE_DIMENSIONS, 3))
+    + [tuple(CUBE_DIMENSIONS)]
+)
+
+CUBE_MEASURES = ['crash_count', 'num_injuries', 'num_fatalities', 'num_vehicles']
+
+
+def grouping_id(dimensions):
+    """
+    Same bitmask as SQL GROUPING(<all cube dimensions>): one bit per dimension,
+    first dimension most significant, set when the dimension is rolled up.
+    """
+    names = list(CUBE_DIMENSIONS)
+    return sum(1 << (len(names) - 1 - i) for i, name in enumerate(names) if name not in dimensions)
+
+
+def create_cube_tables(cursor):
+    """Creates the aggregate cube table over FactCrash"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS CubeFactCrash (
+        grouping_id INTEGER,
+        year INTEGER,
+        month INTEGER,
+        day_of_week TEXT,
+        weather TEXT,
+        collision_type TEXT,
+        municipality TEXT,
+        route_type TEXT,
+        crash_count INTEGER,
+        num_injuries INTEGER,
+        num_fatalities INTEGER,
+        num_vehicles INTEGER
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_cubefactcrash_grouping ON CubeFactCrash(grouping_id)
+    """)
+
+
+CUBE_SOURCE = """
+    FROM FactCrash AS fc
+    LEFT JOIN DimDateTime_Crash AS dt
+        ON fc.date_key_crash = dt.date_key_crash
+    LEFT JOIN DimCondition_Crash AS c
+        ON fc.condition_key_crash = c.condition_key_crash
+    LEFT JOIN DimCrashType AS ct
+        ON fc.crash_type_key = ct.crash_type_key
+    LEFT JOIN DimLocation_Crash AS l
+        ON fc.location_key_crash = l.location_key_crash
+"""
+
+CUBE_AGGREGATES = """COUNT(*), SUM(fc.num_injuries), SUM(fc.num_fatalities),
+        SUM(fc.num_vehicles_involved)"""
+
+
+def build_crash_cube(cursor, backend):
+    """
+    Rebuilds CubeFactCrash from FactCrash in one GROUP BY GROUPING SETS scan.
+    SQLite has no GROUPING SETS, so there each set is a separate GROUP BY.
+    """
+    cursor.execute("DELETE FROM CubeFactCrash")
+    insert = f"""
+        INSERT INTO CubeFactCrash(grouping_id, {', '.join(CUBE_DIMENSIONS)},
+            {', '.join(CUBE_MEASURES)})
+    """
+    columns = ', '.join(CUBE_DIMENSIONS.values())
+
+    if backend != 'sqlite':
+        grouping_sets = ', '.join(
+            '(' + ', '.join(CUBE_DIMENSIONS[name] for name in dims) + ')'
+            for dims in CUBE_GROUPING_SETS
+        )
+        cursor.execute(f"""
+            {insert}
+            SELECT GROUPING({columns}), {columns},
+                {CUBE_AGGREGATES}
+            {CUBE_SOURCE}
+            GROUP BY GROUPING SETS ({grouping_sets})
+        """)
+        return
+
+    for dims in CUBE_GROUPING_SETS:
+        select = ', '.join(expr if name in dims else 'NULL' for name, expr in CUBE_DIMENSIONS.items())
+        group_by = 'GROUP BY ' + ', '.join(CUBE_DIMENSIONS[name] for name in dims) if dims else ''
+        cursor.execute(f"""
+            {insert}
+            SELECT {grouping_id(dims)}, {select},
+                {CUBE_AGGREGATES}
+            {CUBE_SOURCE}
+            {group_by}
+        """)
+
+
+def cube_query(cursor, dimensions=(), filters=None):
+    """
+    Answers a roll-up of FactCrash from the cube.
+
+    dimensions: attributes to group by, e.g. ['year', 'month'].
+    filters: {attribute: value} equality slices, e.g. {'weather': 'RAINING'}.
+    Reads the smallest materialized grouping set that contains every requested
+    attribute and re-aggregates it (the finest set for four or more attributes).
+    Returns a DataFrame with the dimensions, the measures and avg_vehicles.
+    """
+    dimensions = list(dimensions)
+    filters = filters or {}
+    requested = set(dimensions) | set(filters)
+    unknown = requested - set(CUBE_DIMENSIONS)
+    if unknown:
+        raise ValueError(f"Unknown cube dimensions: {sorted(unknown)}")
+
+    source_set = min((dims for dims in CUBE_GROUPING_SETS if requested <= set(dims)), key=len)
+
+    where = ' '.join(f"AND {name} = %s" for name in filters)
+    select = ''.join(f"{name}, " for name in dimensions)
+    group_by = f"GROUP BY {', '.join(dimensions)} ORDER BY {', '.join(dimensions)}" if dimensions else ''
+    cursor.execute(f"""
+        SELECT {select}{', '.join(f'SUM({m})' for m in CUBE_MEASURES)}
+        FROM CubeFactCrash
+        WHERE grouping_id = %s {where}
+        {group_by}
+    """, [grouping_id(source_set)] + list(filters.values()))
+
+    result = pd.DataFrame(cursor.fetchall(), columns=dimensions + CUBE_MEASURES)
+    result["avg_vehicles"] = (result["num_vehicles"] / result["crash_count"]).round(2)
+    return result
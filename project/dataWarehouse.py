@@ -1,259 +1,58 @@
+import json
 import pandas as pd
-import sqlite3
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
 import os
-import psycopg2
-from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
-
-def clean_string_value(value):
-    """Clean string values by handling NaN, None, and standardizing missing value indicators"""
-    if pd.isna(value) or value is None or value == '':
-        return ''
-    return str(value).strip()
-
-def clean_numeric_value(value):
-    """Clean numeric values by handling NaN, None, and invalid values"""
-    if pd.isna(value) or value is None or str(value).strip() == '':
-        return 0
-    try:
-        return float(value)
-    except (ValueError, TypeError):
-        return 0
-    
-def clean_vehicle_year(x):
-    """Clean vehicle year values by handling invalid years"""
-    try:
-        # First convert to float (handles NaN) then to int
-        year = int(float(x)) if pd.notna(x) else 0
-        # Check if year is in valid range
-        if year < 1900 or year > datetime.now().year:
-            return 0
-        return year
-    except (ValueError, TypeError):
-        return 0
-    
-# Define data types explicitly for each column in the crash data CSV
-dtypes = {
-    # Identifiers and Reference Numbers - All should be strings to preserve leading zeros and special characters
-    'Report Number': str,
-    'Local Case Number': str,
-    'Person ID': str,
-    'Vehicle ID': str,
-    
-    # Text Fields - Agency and Location Information
-    'Agency Name': str,
-    'ACRS Report Type': str,
-    'Route Type': str,
-    'Road Name': str,
-    'Cross-Street Name': str,
-    'Off-Road Description': str,
-    'Municipality': str,
-    
-    # Date and Time
-    'Crash Date/Time': str,  # Will be parsed later using datetime
-    
-    # Categorical Fields - Crash Details
-    'Related Non-Motorist': str,
-    'Collision Type': str,
-    'Weather': str,
-    'Surface Condition': str,
-    'Light': str,
-    'Traffic Control': str,
-    
-    # Categorical Fields - Driver and Vehicle Information
-    'Driver Substance Abuse': str,
-    'Non-Motorist Substance Abuse': str,
-    'Driver At Fault': str,
-    'Injury Severity': str,
-    'Circumstance': str,
-    'Driver Distracted By': str,
-    'Drivers License State': str,
-    'Vehicle Damage Extent': str,
-    'Vehicle First Impact Location': str,
-    'Vehicle Body Type': str,
-    'Vehicle Movement': str,
-    'Vehicle Going Dir': str,
-    'Vehicle Make': str,
-    'Vehicle Model': str,
-    
-    # Numeric Fields - Use Int64 for nullable integers
-    'Speed Limit': 'Int64',
-    'Vehicle Year': 'Int64',
-    
-    # Boolean Fields - Will be standardized to Y/N
-    'Driverless Vehicle': str,
-    'Parked Vehicle': str,
-    
-    # Geographic Coordinates - Use float for decimal precision
-    'Latitude': float,
-    'Longitude': float,
-    
-    # Combined Location Field (appears to be a string representation of coordinates)
-    'Location': str
-}
-
-# Additional data cleaning configurations
-na_values = [
-    '', 'N/A', 'NA', 'UNKNOWN', 'NULL',  # Standard missing value indicators
-    'NONE', 'None', '0000', '0',         # Additional missing value variations
-    'NOT REPORTED', 'UNSPECIFIED'         # Domain-specific missing value indicators
-]
-
-# Date parsing format for reference
-date_format = "%m/%d/%Y %I:%M:%S %p"  # Example: "05/27/2021 07:40:00 PM"
-
-
+import sys
+import time
+import uuid
+from backends import connect, backend_of, bulk_insert, list_tables, list_columns
+from cube import create_cube_tables, build_crash_cube
+from ingest import (read_crash_csv, read_staging_csv, expand_sources, detect_schema,
+                    SCHEMA_DRIVERS, SCHEMA_INCIDENTS, SCHEMA_NON_MOTORISTS)
+from profiling import (profile_dataframe, profile_dimensions, write_dq_report,
+                       create_dq_table, save_dq_profile, print_dq_summary)
+from scd import SCD_DIMENSIONS, merge_scd_dimension, resolve_scd_keys
+from spatial import create_spatial_tables, build_crash_cell_aggregates, geohash_values
+from transform import JUNK_COLUMNS, junk_combinations, transform_crash_data, to_ipc, from_ipc
 
 # --------------------------------------------------------------------
-# 1. Lee el CSV con pandas
+# 1. Lee los CSV con pandas y los transforma (ver main())
+#    - ingest.py: tipos, valores nulos y columnas usadas del CSV, y
+#      descubrimiento de archivos (rutas, directorios o patrones glob).
+#    - transform.py: limpieza vectorizada y resumen de FactCrash,
+#      en paralelo por particiones cuando el archivo es grande.
+#    - Con varios archivos, cada uno se lee y transforma en un proceso
+#      del pool (a lo sumo INGEST_WORKERS archivos en vuelo) mientras el
+#      proceso principal carga los anteriores, en orden, con una única
+#      conexión: así las claves de las dimensiones son las mismas para
+#      todos los archivos.
 # --------------------------------------------------------------------
 csv_path = "data/Crash_Reporting_-_Drivers_Data.csv"
-df = pd.read_csv(
-    csv_path,
-    dtype=dtypes,
-    keep_default_na=False,
-    na_values=na_values,
-    encoding='utf-8',
-    on_bad_lines='warn',
-    #parse_dates=['Crash Date/Time'],
-    #date_format="%m/%d/%Y %I:%M:%S %p"  # Use date_format instead of date_parser
-)
-
-# Clean and standardize date/time values
-def clean_datetime(date_str):
-    """Convert date string to standard format, handling invalid dates"""
-    if not date_str:
-        return None
-    try:
-        return datetime.strptime(date_str, "%m/%d/%Y %I:%M:%S %p")
-    except (ValueError, TypeError):
-        return None
-
-# Apply cleaning functions to relevant columns
-for col in df.columns:
-    #if col == 'Crash Date/Time':
-     #   df[col] = df[col].apply(clean_datetime)
-    #el
-    
-    if df[col].dtype in ['int64', 'float64']:
-        df[col] = df[col].apply(clean_numeric_value)
-    else:
-        df[col] = df[col].apply(clean_string_value)
-
-# Handle special cases for Vehicle Year
-df['Vehicle Year'] = df['Vehicle Year'].apply(clean_vehicle_year)
-
-# Normalize boolean fields
-def normalize_boolean(value):
-    """Convert various boolean indicators to Y/N"""
-    if pd.isna(value) or value is None or value == '':
-        return 'N'
-    return 'Y' if str(value).upper() in ['Y', 'YES', 'TRUE', '1'] else 'N'
-
-for bool_col in ['Driverless Vehicle', 'Parked Vehicle']:
-    df[bool_col] = df[bool_col].apply(normalize_boolean)
+INGEST_WORKERS = int(os.environ.get('INGEST_WORKERS', os.cpu_count() or 1))
 
 # --------------------------------------------------------------------
-# 2. Conexiones a las dos bases de datos (SQLite como ejemplo)
+# 2. Conexiones a las dos bases de datos (ver backends.py)
 #    - crash_conn: para el esquema de Crash
 #    - vehicle_conn: para el esquema de Vehicle Involvement
+#    El motor (PostgreSQL, SQLite o DuckDB) se elige con DW_BACKEND.
 # --------------------------------------------------------------------
-def create_database_if_not_exists(dbname, user, password, host, port):
-    """
-    Creates a PostgreSQL database if it doesn't exist.
-    Returns True if database was created, False if it already existed.
-    """
-    # Connect to PostgreSQL server to check/create database
-    conn = psycopg2.connect(
-        database="postgres",  # Connect to default postgres database first
-        user=user,
-        password=password,
-        host=host,
-        port=port
-    )
-    conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
-    cursor = conn.cursor()
-    
-    # Check if database exists
-    cursor.execute("SELECT 1 FROM pg_catalog.pg_database WHERE datname = %s", (dbname,))
-    exists = cursor.fetchone()
-    
-    if not exists:
-        try:
-            cursor.execute(f'CREATE DATABASE "{dbname}"')
-            print(f"Database {dbname} created successfully")
-            created = True
-        except Exception as e:
-            print(f"Error creating database {dbname}: {str(e)}")
-            raise
-    else:
-        print(f"Database {dbname} already exists")
-        created = False
-    
-    cursor.close()
-    conn.close()
-    return created
-
-def get_db_connection(dbname, user, password, host, port):
-    """
-    Creates a connection to the specified database.
-    Creates the database if it doesn't exist.
-    """
-    try:
-        # First ensure database exists
-        create_database_if_not_exists(dbname, user, password, host, port)
-        
-        # Connect to the specified database
-        conn = psycopg2.connect(
-            database=dbname,
-            user=user,
-            password=password,
-            host=host,
-            port=port
-        )
-        print(f"Successfully connected to database {dbname}")
-        return conn
-    
-    except Exception as e:
-        print(f"Error connecting to database {dbname}: {str(e)}")
-        raise
-
-# Database configuration
-DB_CONFIG = {
-    'user': 'postgres',
-    'password': '1234',
-    'host': 'localhost',
-    'port': '5433'
-}
-
-# Create connections for both databases
-try:
-    # Setup crash database connection
-    crash_conn = get_db_connection(
-        dbname='crashDW',
-        **DB_CONFIG
-    )
-    
-    # Setup vehicle database connection
-    vehicle_conn = get_db_connection(
-        dbname='vehicleDW',
-        **DB_CONFIG
-    )
-    
-    # Get cursors
-    crash_cursor = crash_conn.cursor()
-    vehicle_cursor = vehicle_conn.cursor()
-    
-except Exception as e:
-    print(f"Error during database setup: {str(e)}")
-    raise
+# Checkpointing configuration
+# Commit every CHECKPOINT_BATCH_SIZE fact rows and record progress in etl_checkpoint,
+# so a failed run can be restarted from the last committed batch.
+CHECKPOINT_ENABLED = True
+CHECKPOINT_BATCH_SIZE = 5000
 
 # --------------------------------------------------------------------
 # 3. Crear las tablas correspondientes en cada DB
 # --------------------------------------------------------------------
 # 3.1. Tablas del CrashDW
-# Modify the table creation statements for PostgreSQL
-# Note: Remove AUTOINCREMENT and use SERIAL instead
+# The DDL is written for PostgreSQL; backends.py rewrites SERIAL keys
+# for SQLite (AUTOINCREMENT) and DuckDB (sequences)
+# The lookup dimensions keep their natural key as canonical text in a UNIQUE
+# natural_key column (see natural_key()): a UNIQUE constraint over the
+# attribute columns would not match rows with NULL attributes
 def create_crash_tables(cursor):
     """Creates tables for the crash database"""
     cursor.execute("""
@@ -272,19 +71,36 @@ def create_crash_tables(cursor):
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS DimLocation_Crash (
         location_key_crash SERIAL PRIMARY KEY,
+        natural_key TEXT UNIQUE,
         route_type TEXT,
         road_name TEXT,
         cross_street_name TEXT,
         off_road_description TEXT,
         municipality TEXT,
-        latitude REAL,
-        longitude REAL
+        latitude DOUBLE PRECISION,
+        longitude DOUBLE PRECISION,
+        geohash_5 TEXT,
+        geohash_6 TEXT,
+        geohash_7 TEXT
     )
     """)
 
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimlocation_crash_geohash_5 ON DimLocation_Crash(geohash_5)
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimlocation_crash_geohash_6 ON DimLocation_Crash(geohash_6)
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimlocation_crash_geohash_7 ON DimLocation_Crash(geohash_7)
+    """)
+
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS DimCondition_Crash (
         condition_key_crash SERIAL PRIMARY KEY,
+        natural_key TEXT UNIQUE,
         weather TEXT,
         surface_condition TEXT,
         light TEXT,
@@ -295,6 +111,7 @@ def create_crash_tables(cursor):
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS DimCrashType (
         crash_type_key SERIAL PRIMARY KEY,
+        natural_key TEXT UNIQUE,
         acrs_report_type TEXT,
         collision_type TEXT,
         related_non_motorist TEXT,
@@ -332,15 +149,31 @@ def create_vehicle_tables(cursor):
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS DimLocation_Veh (
         location_key_vehicle SERIAL PRIMARY KEY,
+        natural_key TEXT UNIQUE,
         route_type TEXT,
         road_name TEXT,
         cross_street_name TEXT,
         municipality TEXT,
-        latitude REAL,
-        longitude REAL
+        latitude DOUBLE PRECISION,
+        longitude DOUBLE PRECISION,
+        geohash_5 TEXT,
+        geohash_6 TEXT,
+        geohash_7 TEXT
     )
     """)
 
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimlocation_veh_geohash_5 ON DimLocation_Veh(geohash_5)
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimlocation_veh_geohash_6 ON DimLocation_Veh(geohash_6)
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimlocation_veh_geohash_7 ON DimLocation_Veh(geohash_7)
+    """)
+
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS DimDriver (
         driver_key SERIAL PRIMARY KEY,
@@ -349,10 +182,20 @@ def create_vehicle_tables(cursor):
         driver_distracted_by TEXT,
         drivers_license_state TEXT,
         person_id TEXT,
-        driver_at_fault TEXT
+        driver_at_fault TEXT,
+        effective_from TEXT,
+        effective_to TEXT,
+        is_current BOOLEAN
     )
     """)
 
+    # Natural key only: late versions move effective_from of referenced rows, and
+    # DuckDB rewrites an update of an indexed column as a delete + insert, which
+    # the foreign keys of FactVehicleInvolment reject
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimdriver_natural_key ON DimDriver(person_id)
+    """)
+
     cursor.execute("""
     CREATE TABLE IF NOT EXISTS DimVehicle (
         vehicle_key SERIAL PRIMARY KEY,
@@ -363,11 +206,30 @@ def create_vehicle_tables(cursor):
         vehicle_movement TEXT,
         vehicle_going_dir TEXT,
         speed_limit INTEGER,
-        driverless_vehicle TEXT,
-        parked_vehicle TEXT,
+        driverless_vehicle BOOLEAN,
+        parked_vehicle BOOLEAN,
         vehicle_year INTEGER,
         vehicle_make TEXT,
-        vehicle_model TEXT
+        vehicle_model TEXT,
+        effective_from TEXT,
+        effective_to TEXT,
+        is_current BOOLEAN
+    )
+    """)
+
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_dimvehicle_natural_key ON DimVehicle(vehicle_id)
+    """)
+
+    # Junk dimension: one row per combination of the low-cardinality
+    # attributes of a vehicle involvement
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS DimJunk_Veh (
+        junk_key_vehicle SERIAL PRIMARY KEY,
+        injury_severity TEXT,
+        driver_at_fault TEXT,
+        circumstance TEXT,
+        UNIQUE (injury_severity, driver_at_fault, circumstance)
     )
     """)
 
@@ -378,30 +240,171 @@ def create_vehicle_tables(cursor):
         location_key_vehicle INTEGER REFERENCES DimLocation_Veh(location_key_vehicle),
         driver_key INTEGER REFERENCES DimDriver(driver_key),
         vehicle_key INTEGER REFERENCES DimVehicle(vehicle_key),
-        injury_security TEXT,
-        drive_at_fault_flag TEXT,
-        circumstance TEXT
+        junk_key_vehicle INTEGER REFERENCES DimJunk_Veh(junk_key_vehicle)
     )
     """)
 
-# Create the tables
-try:
-    # Create tables in crash database
-    create_crash_tables(crash_cursor)
-    crash_conn.commit()
-    print("Crash tables created successfully")
-    
-    # Create tables in vehicle database
-    create_vehicle_tables(vehicle_cursor)
-    vehicle_conn.commit()
-    print("Vehicle tables created successfully")
-    
-except Exception as e:
-    print(f"Error creating tables: {str(e)}")
-    # Rollback in case of error
-    crash_conn.rollback()
-    vehicle_conn.rollback()
-    raise
+def create_control_tables(cursor):
+    """
+    Creates the ETL control tables: etl_checkpoint records load progress,
+    etl_load_generation counts completed loads and gives each one a random load_id
+    (query caches are keyed on it: the counter restarts when a database is rebuilt)
+    and etl_schema_version records the schema version (see migrate_schema).
+    """
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS etl_checkpoint (
+        source TEXT,
+        stage TEXT,
+        last_offset INTEGER,
+        last_report_number TEXT,
+        status TEXT,
+        updated_at TEXT,
+        fingerprint TEXT,
+        row_count INTEGER,
+        PRIMARY KEY (source, stage)
+    )
+    """)
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS etl_load_generation (
+        id INTEGER PRIMARY KEY,
+        generation INTEGER,
+        loaded_at TEXT,
+        load_id TEXT
+    )
+    """)
+    cursor.execute("""
+        INSERT INTO etl_load_generation(id, generation, loaded_at, load_id)
+        VALUES (1, 0, NULL, %s)
+        ON CONFLICT (id) DO NOTHING
+    """, (uuid.uuid4().hex,))
+
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS etl_schema_version (
+        id INTEGER PRIMARY KEY,
+        version INTEGER,
+        migrated_at TEXT
+    )
+    """)
+
+# 3.2. Versiones del esquema
+# Each change to the DDL of an existing table bumps the schema version of its
+# database. Additive steps are applied in place with ALTER TABLE ... ADD COLUMN
+# (plus an optional 'backfill' of the loaded rows); 'rebuild' steps change keys or
+# types of loaded rows, and the database has to be dropped and loaded again.
+# Version 1 is the first versioned schema; the databases created before it (the
+# original star schema) have no etl_schema_version table and count as version 0.
+SCHEMA_MIGRATIONS = {
+    'crashDW': [
+        {
+            'version': 1,
+            'description': 'geohash cells, UNIQUE natural keys and DOUBLE PRECISION coordinates '
+                           'in the dimensions, ETL control tables',
+            'add_columns': {},
+            'rebuild': True,
+        },
+    ],
+    'vehicleDW': [
+        {
+            'version': 1,
+            'description': 'geohash cells, UNIQUE natural keys and DOUBLE PRECISION coordinates '
+                           'in DimLocation_Veh, SCD2 DimDriver and DimVehicle, junk dimension, '
+                           'ETL control tables',
+            'add_columns': {},
+            'rebuild': True,
+        },
+    ],
+}
+FACT_TABLES = {'crashDW': 'FactCrash', 'vehicleDW': 'FactVehicleInvolment'}
+
+def get_schema_version(conn, dbname):
+    """
+    Returns the schema version recorded in etl_schema_version. A database without
+    that table is at version 0 if it already holds the star schema, and None when
+    it is empty (it is created at the latest version).
+    """
+    tables = [table.lower() for table in list_tables(conn)]
+    if 'etl_schema_version' in tables:
+        cursor = conn.cursor()
+        cursor.execute("SELECT version FROM etl_schema_version WHERE id = 1")
+        row = cursor.fetchone()
+        if row:
+            return row[0]
+    return 0 if FACT_TABLES[dbname].lower() in tables else None
+
+def migrate_schema(conn, dbname):
+    """
+    Brings an existing database up to the latest schema version before the
+    CREATE TABLE IF NOT EXISTS statements run (they do not alter existing tables).
+    Raises RuntimeError, before changing anything, when a pending step cannot be
+    applied in place.
+    """
+    version = get_schema_version(conn, dbname)
+    if version is None:
+        return
+    pending = [step for step in SCHEMA_MIGRATIONS[dbname] if step['version'] > version]
+    rebuilds = [step for step in pending if step.get('rebuild')]
+    if rebuilds:
+        raise RuntimeError(
+            f"{dbname} is at schema version {version} and version {rebuilds[-1]['version']} "
+            f"({rebuilds[-1]['description']}) cannot be applied in place: "
+            f"drop the database and run the ETL again"
+        )
+
+    cursor = conn.cursor()
+    for step in pending:
+        for table, columns in step['add_columns'].items():
+            existing = list_columns(conn, table)
+            for col, col_type in columns:
+                if existing and col not in existing:
+                    cursor.execute(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}")
+        if step.get('backfill'):
+            step['backfill'](cursor)
+        # Committed per step (DuckDB cannot create indexes in the same transaction
+        # as a backfill); re-running a step finds its columns
+        conn.commit()
+        print(f"{dbname}: migrated to schema version {step['version']} ({step['description']})")
+
+def save_schema_version(cursor, dbname):
+    """Records the latest schema version of dbname in etl_schema_version"""
+    version = SCHEMA_MIGRATIONS[dbname][-1]['version']
+    cursor.execute("""
+        INSERT INTO etl_schema_version(id, version, migrated_at)
+        VALUES (1, %s, %s)
+        ON CONFLICT (id) DO UPDATE SET version = excluded.version, migrated_at = excluded.migrated_at
+    """, (version, datetime.now().isoformat(timespec='seconds')))
+
+def create_all_tables(crash_conn, vehicle_conn):
+    """Migrates (if needed) and creates the star schema and control tables in both databases"""
+    crash_cursor = crash_conn.cursor()
+    vehicle_cursor = vehicle_conn.cursor()
+    try:
+        migrate_schema(crash_conn, 'crashDW')
+        migrate_schema(vehicle_conn, 'vehicleDW')
+
+        # Create tables in crash database
+        create_crash_tables(crash_cursor)
+        create_spatial_tables(crash_cursor)
+        create_cube_tables(crash_cursor)
+        create_dq_table(crash_cursor)
+        create_control_tables(crash_cursor)
+        save_schema_version(crash_cursor, 'crashDW')
+        crash_conn.commit()
+        print("Crash tables created successfully")
+
+        # Create tables in vehicle database
+        create_vehicle_tables(vehicle_cursor)
+        create_control_tables(vehicle_cursor)
+        save_schema_version(vehicle_cursor, 'vehicleDW')
+        vehicle_conn.commit()
+        print("Vehicle tables created successfully")
+
+    except Exception as e:
+        print(f"Error creating tables: {str(e)}")
+        # Rollback in case of error
+        crash_conn.rollback()
+        vehicle_conn.rollback()
+        raise
 
 # --------------------------------------------------------------------
 # 4. Funciones helpers para Dimensions (Lookups)
@@ -410,14 +413,14 @@ except Exception as e:
 # --------------------------------------------------------------------
 # Helper functions for Crash DW
 dimDateCrashDict = {}
-def get_date_key_crash(crash_date_str, cursor):
+def get_date_key_crash(crash_datetime, cursor):
     """
     Converts date/time to integer and creates record in DimDateTime_Crash if it doesn't exist.
     """
-    if not crash_date_str:
+    if pd.isna(crash_datetime):
         return None
     
-    dt = datetime.strptime(crash_date_str, "%m/%d/%Y %I:%M:%S %p")
+    dt = crash_datetime
     date_key = int(dt.strftime("%Y%m%d%H"))
 
     if date_key not in dimDateCrashDict:
@@ -439,6 +442,33 @@ def get_date_key_crash(crash_date_str, cursor):
 
     return date_key
 
+def natural_key(values):
+    """
+    Canonical text form of a dimension's natural key: NULL-safe (NaN, None and
+    pd.NA are all null) and exact for float coordinates.
+    """
+    return json.dumps([None if pd.isna(value) else value.item() if hasattr(value, 'item') else value
+                       for value in values])
+
+def insert_dimension_row(cursor, table, key_column, columns, values, key):
+    """
+    Inserts a dimension row identified by its natural_key and returns its surrogate
+    key. A row already committed by a previous run is found through the UNIQUE
+    natural_key instead of being duplicated.
+    """
+    placeholders = ', '.join(['%s'] * (len(columns) + 1))
+    cursor.execute(f"""
+        INSERT INTO {table}(natural_key, {', '.join(columns)})
+        VALUES ({placeholders})
+        ON CONFLICT (natural_key) DO NOTHING
+        RETURNING {key_column}
+    """, (key,) + tuple(values))
+    row = cursor.fetchone()
+    if row is None:
+        cursor.execute(f"SELECT {key_column} FROM {table} WHERE natural_key = %s", (key,))
+        row = cursor.fetchone()
+    return row[0]
+
 dimLocCrashDict = {}
 def get_location_key_crash(row, cursor):
     """
@@ -449,18 +479,16 @@ def get_location_key_crash(row, cursor):
         row["Off-Road Description"], row["Municipality"],
         row["Latitude"], row["Longitude"]
     )
-    
-    if loc_tuple not in dimLocCrashDict:
-        cursor.execute("""
-            INSERT INTO DimLocation_Crash(route_type, road_name, cross_street_name, 
-                off_road_description, municipality, latitude, longitude)
-            VALUES (%s, %s, %s, %s, %s, %s, %s)
-            RETURNING location_key_crash
-        """, loc_tuple)
-        location_id = cursor.fetchone()[0]
-        dimLocCrashDict[loc_tuple] = location_id
-    
-    return dimLocCrashDict[loc_tuple]
+    key = natural_key(loc_tuple)
+
+    if key not in dimLocCrashDict:
+        dimLocCrashDict[key] = insert_dimension_row(
+            cursor, 'DimLocation_Crash', 'location_key_crash',
+            ['route_type', 'road_name', 'cross_street_name', 'off_road_description', 'municipality',
+             'latitude', 'longitude', 'geohash_5', 'geohash_6', 'geohash_7'],
+            loc_tuple + geohash_values(row), key)
+
+    return dimLocCrashDict[key]
 
 dimCondCrashDict = {}
 def get_condition_key_crash(row, cursor):
@@ -473,17 +501,14 @@ def get_condition_key_crash(row, cursor):
         row["Light"],
         row["Traffic Control"]
     )
-    
-    if cond_tuple not in dimCondCrashDict:
-        cursor.execute("""
-            INSERT INTO DimCondition_Crash(weather, surface_condition, light, traffic_control)
-            VALUES (%s, %s, %s, %s)
-            RETURNING condition_key_crash
-        """, cond_tuple)
-        cond_id = cursor.fetchone()[0]
-        dimCondCrashDict[cond_tuple] = cond_id
-    
-    return dimCondCrashDict[cond_tuple]
+    key = natural_key(cond_tuple)
+
+    if key not in dimCondCrashDict:
+        dimCondCrashDict[key] = insert_dimension_row(
+            cursor, 'DimCondition_Crash', 'condition_key_crash',
+            ['weather', 'surface_condition', 'light', 'traffic_control'], cond_tuple, key)
+
+    return dimCondCrashDict[key]
 
 dimCrashTypeDict = {}
 def get_crash_type_key(row, cursor):
@@ -496,28 +521,25 @@ def get_crash_type_key(row, cursor):
         row["Related Non-Motorist"],
         row["Agency Name"]
     )
-    
-    if ctype_tuple not in dimCrashTypeDict:
-        cursor.execute("""
-            INSERT INTO DimCrashType(acrs_report_type, collision_type, related_non_motorist, agency_name)
-            VALUES (%s, %s, %s, %s)
-            RETURNING crash_type_key
-        """, ctype_tuple)
-        ctype_id = cursor.fetchone()[0]
-        dimCrashTypeDict[ctype_tuple] = ctype_id
-    
-    return dimCrashTypeDict[ctype_tuple]
+    key = natural_key(ctype_tuple)
+
+    if key not in dimCrashTypeDict:
+        dimCrashTypeDict[key] = insert_dimension_row(
+            cursor, 'DimCrashType', 'crash_type_key',
+            ['acrs_report_type', 'collision_type', 'related_non_motorist', 'agency_name'], ctype_tuple, key)
+
+    return dimCrashTypeDict[key]
 
 # Helper functions for Vehicle DW
 dimDateVehDict = {}
-def get_date_key_vehicle(crash_date_str, cursor):
+def get_date_key_vehicle(crash_datetime, cursor):
     """
     Handles date dimension for vehicle data warehouse
     """
-    if not crash_date_str:
+    if pd.isna(crash_datetime):
         return None
         
-    dt = datetime.strptime(crash_date_str, "%m/%d/%Y %I:%M:%S %p")
+    dt = crash_datetime
     date_key = int(dt.strftime("%Y%m%d%H"))
     
     if date_key not in dimDateVehDict:
@@ -546,187 +568,557 @@ def get_location_key_vehicle(row, cursor):
         row["Route Type"], row["Road Name"], row["Cross-Street Name"],
         row["Municipality"], row["Latitude"], row["Longitude"]
     )
-    
-    if loc_tuple not in dimLocVehDict:
-        cursor.execute("""
-            INSERT INTO DimLocation_Veh(route_type, road_name, cross_street_name,
-                municipality, latitude, longitude)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING location_key_vehicle
-        """, loc_tuple)
-        location_id = cursor.fetchone()[0]
-        dimLocVehDict[loc_tuple] = location_id
-    
-    return dimLocVehDict[loc_tuple]
+    key = natural_key(loc_tuple)
+
+    if key not in dimLocVehDict:
+        dimLocVehDict[key] = insert_dimension_row(
+            cursor, 'DimLocation_Veh', 'location_key_vehicle',
+            ['route_type', 'road_name', 'cross_street_name', 'municipality',
+             'latitude', 'longitude', 'geohash_5', 'geohash_6', 'geohash_7'],
+            loc_tuple + geohash_values(row), key)
+
+    return dimLocVehDict[key]
+
+# DimDriver y DimVehicle son SCD tipo 2 (ver scd.py): se cargan en bloque
+# antes de FactVehicleInvolment y sus claves se resuelven sobre el DataFrame
 
-dimDriverDict = {}
-def get_driver_key(row, cursor):
+def load_junk_dimension(cursor, frame, combinations):
     """
-    Handles driver dimension
+    Inserts the junk attribute combinations (computed by the transform, see
+    transform.junk_combinations) missing from DimJunk_Veh in one bulk insert and
+    adds the resolved junk_key_vehicle column to frame.
     """
-    driver_tuple = (
-        row["Driver Substance Abuse"],
-        row["Non-Motorist Substance Abuse"],
-        row["Driver Distracted By"],
-        row["Drivers License State"],
-        row["Person ID"],
-        row["Driver At Fault"]
-    )
-    
-    if driver_tuple not in dimDriverDict:
-        cursor.execute("""
-            INSERT INTO DimDriver(driver_substance_abuse, non_motorist_substance_abuse,
-                driver_distracted_by, drivers_license_state, person_id, driver_at_fault)
-            VALUES (%s, %s, %s, %s, %s, %s)
-            RETURNING driver_key
-        """, driver_tuple)
-        driver_id = cursor.fetchone()[0]
-        dimDriverDict[driver_tuple] = driver_id
-    
-    return dimDriverDict[driver_tuple]
+    columns = list(JUNK_COLUMNS)
+    cursor.execute(f"SELECT junk_key_vehicle, {', '.join(columns)} FROM DimJunk_Veh")
+    existing = pd.DataFrame(cursor.fetchall(), columns=['junk_key_vehicle'] + columns)
+
+    combos = combinations.merge(existing, how='left', on=columns)
+    new = combos.loc[combos['junk_key_vehicle'].isna(), columns]
+    if len(new):
+        bulk_insert(cursor, 'DimJunk_Veh', columns, list(new.itertuples(index=False, name=None)))
+        cursor.execute(f"SELECT junk_key_vehicle, {', '.join(columns)} FROM DimJunk_Veh")
+        existing = pd.DataFrame(cursor.fetchall(), columns=['junk_key_vehicle'] + columns)
+
+    rows = frame[list(JUNK_COLUMNS.values())].set_axis(columns, axis=1)
+    frame['junk_key_vehicle'] = rows.merge(existing, how='left', on=columns)['junk_key_vehicle'].to_numpy()
 
-dimVehicleDict = {}
-def get_vehicle_key(row, cursor):
+# --------------------------------------------------------------------
+# 4.1. Checkpoints de la carga
+#    - Cada etapa (fact_crash, scd_dimensions, fact_vehicle) de cada archivo
+#      guarda en etl_checkpoint el último offset confirmado, en la misma
+#      transacción que los datos.
+#    - Los archivos se identifican por su ruta absoluta (ver expand_sources)
+#      y cada checkpoint guarda la huella del archivo (tamaño y fecha de
+#      modificación) y su número de filas.
+#    - Si la carga falla, la siguiente ejecución continúa desde ahí. Si el
+#      archivo cambió desde entonces, la carga se detiene con un error en
+#      lugar de continuar u omitirlo.
+#    - Para forzar una carga completa, borrar las filas de etl_checkpoint.
+# --------------------------------------------------------------------
+def file_fingerprint(path):
+    """Returns the fingerprint of a source file recorded with its checkpoints: size and mtime"""
+    stat = os.stat(path)
+    return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+def get_checkpoint(cursor, source, stage):
     """
-    Handles vehicle dimension
+    Returns (last_offset, status, fingerprint, row_count) for a stage of a source
+    file, or (0, None, None, None) if the stage has never been started.
     """
-    # Ensure numeric values are properly handled
-    speed_limit = clean_numeric_value(row["Speed Limit"])
-    vehicle_year = clean_vehicle_year(row["Vehicle Year"])
-    
-    vehicle_tuple = (
-        clean_string_value(row["Vehicle ID"]),
-        clean_string_value(row["Vehicle Damage Extent"]),
-        clean_string_value(row["Vehicle First Impact Location"]),
-        clean_string_value(row["Vehicle Body Type"]),
-        clean_string_value(row["Vehicle Movement"]),
-        clean_string_value(row["Vehicle Going Dir"]),
-        speed_limit,  # Using cleaned numeric value
-        clean_string_value(row["Driverless Vehicle"]),
-        clean_string_value(row["Parked Vehicle"]),
-        vehicle_year,  # Using cleaned vehicle year
-        clean_string_value(row["Vehicle Make"]),
-        clean_string_value(row["Vehicle Model"])
-    )
-    
-    if vehicle_tuple not in dimVehicleDict:
-        cursor.execute("""
-            INSERT INTO DimVehicle(vehicle_id, vehicle_damage_extent, vehicle_first_impact_location,
-                vehicle_body_type, vehicle_movement, vehicle_going_dir, speed_limit,
-                driverless_vehicle, parked_vehicle, vehicle_year, vehicle_make, vehicle_model)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING vehicle_key
-        """, vehicle_tuple)
-        veh_id = cursor.fetchone()[0]
-        dimVehicleDict[vehicle_tuple] = veh_id
-    
-    return dimVehicleDict[vehicle_tuple]
+    cursor.execute("""
+        SELECT last_offset, status, fingerprint, row_count FROM etl_checkpoint
+        WHERE source = %s AND stage = %s
+    """, (source, stage))
+    result = cursor.fetchone()
+    if result is None:
+        return 0, None, None, None
+    return tuple(result)
+
+def check_checkpoint(cursor, source, stage, fingerprint, row_count):
+    """
+    Returns the row a stage of source resumes from, or None when it is already done.
+    Raises RuntimeError when the stage was started or completed on another version
+    of the file (other fingerprint or row count): resuming would skip or repeat
+    rows, and skipping would ignore the changes.
+    """
+    last_offset, status, stored_fingerprint, stored_rows = get_checkpoint(cursor, source, stage)
+    if status is None:
+        return 0
+    if (stored_fingerprint, stored_rows) != (fingerprint, row_count):
+        raise RuntimeError(
+            f"{source} changed since stage {stage} was {'completed' if status == 'done' else 'started'} "
+            f"(fingerprint {stored_fingerprint} with {stored_rows} rows, now {fingerprint} with "
+            f"{row_count} rows). The rows loaded from the earlier version stay in the warehouse; "
+            f"delete its etl_checkpoint rows to load it anyway"
+        )
+    return None if status == 'done' else last_offset
+
+def save_checkpoint(cursor, source, stage, fingerprint, row_count, last_offset, last_report_number, status):
+    """
+    Records the progress of a stage. Must be committed together with the rows it covers.
+    """
+    cursor.execute("""
+        INSERT INTO etl_checkpoint(source, stage, last_offset, last_report_number, status, updated_at,
+            fingerprint, row_count)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (source, stage) DO UPDATE SET
+            last_offset = EXCLUDED.last_offset,
+            last_report_number = EXCLUDED.last_report_number,
+            status = EXCLUDED.status,
+            updated_at = EXCLUDED.updated_at,
+            fingerprint = EXCLUDED.fingerprint,
+            row_count = EXCLUDED.row_count
+    """, (source, stage, last_offset, last_report_number, status,
+          datetime.now().strftime("%Y-%m-%d %H:%M:%S"), fingerprint, row_count))
+
+def warm_crash_caches(cursor):
+    """
+    Reloads the Crash DW dimension caches from the database before a load, so
+    dimension rows committed by a previous run or file are reused instead of duplicated
+    (and keys of rows rolled back by a failed load are forgotten).
+    """
+    for cache in (dimDateCrashDict, dimLocCrashDict, dimCondCrashDict, dimCrashTypeDict):
+        cache.clear()
+    cursor.execute("SELECT date_key_crash FROM DimDateTime_Crash")
+    for (date_key,) in cursor.fetchall():
+        dimDateCrashDict[date_key] = True
+
+    cursor.execute("SELECT natural_key, location_key_crash FROM DimLocation_Crash")
+    dimLocCrashDict.update(cursor.fetchall())
+
+    cursor.execute("SELECT natural_key, condition_key_crash FROM DimCondition_Crash")
+    dimCondCrashDict.update(cursor.fetchall())
+
+    cursor.execute("SELECT natural_key, crash_type_key FROM DimCrashType")
+    dimCrashTypeDict.update(cursor.fetchall())
+
+def warm_vehicle_caches(cursor):
+    """
+    Reloads the Vehicle DW dimension caches from the database before a load.
+    """
+    for cache in (dimDateVehDict, dimLocVehDict):
+        cache.clear()
+    cursor.execute("SELECT date_key_vehicle FROM DimDateTime_Veh")
+    for (date_key,) in cursor.fetchall():
+        dimDateVehDict[date_key] = True
+
+    cursor.execute("SELECT natural_key, location_key_vehicle FROM DimLocation_Veh")
+    dimLocVehDict.update(cursor.fetchall())
+
+def run_checkpointed_load(conn, cursor, source, fingerprint, stage, frame, key_column, insert_row,
+                          warm_caches):
+    """
+    Inserts every row of frame (read from source) with insert_row(row, cursor).
+
+    With CHECKPOINT_ENABLED, commits every CHECKPOINT_BATCH_SIZE rows and records
+    the offset and last report number in etl_checkpoint. A restarted run skips
+    the rows already committed and continues from the last checkpoint, as long as
+    the file still has the same fingerprint and row count (see check_checkpoint).
+    """
+    if not CHECKPOINT_ENABLED:
+        warm_caches(cursor)
+        for idx, row in frame.iterrows():
+            insert_row(row, cursor)
+        conn.commit()
+        return
+
+    start_offset = check_checkpoint(cursor, source, stage, fingerprint, len(frame))
+    if start_offset is None:
+        print(f"Stage {stage} already completed for {source}, skipping")
+        return
+    if start_offset > 0:
+        print(f"Resuming stage {stage} from row {start_offset}")
+    warm_caches(cursor)
+
+    offset = start_offset
+    last_report_number = None
+    for idx, row in frame.iloc[start_offset:].iterrows():
+        insert_row(row, cursor)
+        offset += 1
+        last_report_number = row[key_column]
+
+        if offset % CHECKPOINT_BATCH_SIZE == 0:
+            save_checkpoint(cursor, source, stage, fingerprint, len(frame), offset, last_report_number,
+                            'running')
+            conn.commit()
+            print(f"Stage {stage}: {offset}/{len(frame)} rows committed")
+
+    save_checkpoint(cursor, source, stage, fingerprint, len(frame), offset, last_report_number, 'done')
+    conn.commit()
+    print(f"Stage {stage}: {offset}/{len(frame)} rows committed")
+
+def load_scd_dimensions(conn, cursor, source, fingerprint, frame):
+    """
+    Merges the driver and vehicle versions of frame into DimDriver and DimVehicle
+    (one transaction, recorded as the 'scd_dimensions' stage of source) and adds the
+    resolved driver_key and vehicle_key columns to frame.
+    """
+    done = CHECKPOINT_ENABLED and check_checkpoint(
+        cursor, source, 'scd_dimensions', fingerprint, len(frame)) is None
+    if done:
+        print(f"Stage scd_dimensions already completed for {source}, skipping merge")
+    else:
+        for dimension in SCD_DIMENSIONS:
+            inserted, late, conflicts, repointed = merge_scd_dimension(cursor, dimension, frame)
+            print(f"{dimension}: {inserted} new versions, {late} versions added to the history "
+                  f"of late-arriving keys, {repointed} facts re-pointed")
+            if conflicts:
+                print(f"{dimension}: {conflicts} late rows skipped, they conflict with "
+                      f"an existing version with the same effective_from")
+        if CHECKPOINT_ENABLED:
+            save_checkpoint(cursor, source, 'scd_dimensions', fingerprint, len(frame), len(frame), None,
+                            'done')
+        conn.commit()
+
+    for dimension, spec in SCD_DIMENSIONS.items():
+        frame[spec['surrogate_key']] = resolve_scd_keys(cursor, dimension, frame)
+    conn.commit()
+
+def clear_load_id(conn):
+    """
+    Clears the load_id of a database before a load commits its first batch. Query
+    caches are keyed on load_id and are not used without one, so no result is
+    served from before the load, or cached from partial data, while the load runs
+    or after it fails (until a later load completes).
+    """
+    cursor = conn.cursor()
+    cursor.execute("UPDATE etl_load_generation SET load_id = NULL WHERE id = 1")
+    conn.commit()
+
+def bump_load_generation(cursor):
+    """
+    Increments the load generation of a database and draws a new load_id once a
+    load has completed, which turns the query caches back on (see clear_load_id).
+    """
+    cursor.execute("""
+        UPDATE etl_load_generation
+        SET generation = generation + 1, loaded_at = %s, load_id = %s
+        WHERE id = 1
+    """, (datetime.now().strftime("%Y-%m-%d %H:%M:%S"), uuid.uuid4().hex))
+
 # --------------------------------------------------------------------
 # 5. Llenar Dimensiones + FactCrash
 #    Para FactCrash, necesitamos agrupar por "Report Number".
 #    calculamos: num_vehicles_involved, num_injuries, num_fatalities (si aplica)
 # --------------------------------------------------------------------
 
-# 5.1. Generamos un DF agrupado por "Report Number"
-#     Suponiendo que:
+# 5.1. El DF agrupado por "Report Number" (factCrashDF) lo genera
+#      transform.merge_crash_summaries():
 #         num_vehicles_involved = COUNT(distinct Vehicle ID)
 #         num_injuries = COUNT(rows donde "Injury Severity" != "NO APPARENT INJURY")
-#         num_fatalities = COUNT(rows donde "Injury Severity" indica algo fatal) – si tuviéramos esa info
-#
-#     Ajustar según tu propia lógica.
+#         num_fatalities = COUNT(rows donde "Injury Severity" indica algo fatal)
 # --------------------------------------------------------------------
-def is_injury(sev):
-    # Por ejemplo, consideramos lesión toda que no sea "NO APPARENT INJURY"
-    return sev.strip().upper() != "NO APPARENT INJURY"
-
-def is_fatal(sev):
-    # Ejemplo si el CSV tuviera "FATAL INJURY"
-    return "FATAL" in sev.strip().upper()
-
-grouped = df.groupby("Report Number")
-summary_list = []
-
-for report_number, group in grouped:
-    num_veh_involved = group["Vehicle ID"].nunique()
-    num_injuries = sum(group["Injury Severity"].apply(is_injury))
-    num_fatalities = sum(group["Injury Severity"].apply(is_fatal))
-    # Tomamos la primera fila para extraer datos "globales" del crash
-    first_row = group.iloc[0]
-
-    summary_list.append({
-        "report_number": report_number,
-        "Crash Date/Time": first_row["Crash Date/Time"],
-        "Route Type": first_row["Route Type"],
-        "Road Name": first_row["Road Name"],
-        "Cross-Street Name": first_row["Cross-Street Name"],
-        "Off-Road Description": first_row["Off-Road Description"],
-        "Municipality": first_row["Municipality"],
-        "Latitude": first_row["Latitude"],
-        "Longitude": first_row["Longitude"],
-        "Weather": first_row["Weather"],
-        "Surface Condition": first_row["Surface Condition"],
-        "Light": first_row["Light"],
-        "Traffic Control": first_row["Traffic Control"],
-        "ACRS Report Type": first_row["ACRS Report Type"],
-        "Collision Type": first_row["Collision Type"],
-        "Related Non-Motorist": first_row["Related Non-Motorist"],
-        "Agency Name": first_row["Agency Name"],
-        "num_vehicles_involved": num_veh_involved,
-        "num_injuries": num_injuries,
-        "num_fatalities": num_fatalities
-    })
-
-factCrashDF = pd.DataFrame(summary_list)
 
 # 5.2. Insertar en tablas Dim y luego FactCrash
-for idx, row in factCrashDF.iterrows():
-    date_key = get_date_key_crash(row["Crash Date/Time"], crash_cursor)
-    loc_key = get_location_key_crash(row, crash_cursor)
-    cond_key = get_condition_key_crash(row, crash_cursor)
-    ctype_key = get_crash_type_key(row, crash_cursor)
+def insert_fact_crash(row, cursor):
+    """Resolves the dimension keys of a summarized crash and inserts its FactCrash row"""
+    date_key = get_date_key_crash(row["crash_datetime"], cursor)
+    loc_key = get_location_key_crash(row, cursor)
+    cond_key = get_condition_key_crash(row, cursor)
+    ctype_key = get_crash_type_key(row, cursor)
 
-    crash_cursor.execute("""
+    cursor.execute("""
         INSERT INTO FactCrash(date_key_crash, location_key_crash, condition_key_crash,
             crash_type_key, num_vehicles_involved, num_injuries,
             num_fatalities, report_number)
         VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
     """, (
         date_key, loc_key, cond_key, ctype_key,
-        row["num_vehicles_involved"], row["num_injuries"], row["num_fatalities"],
+        int(row["num_vehicles_involved"]), int(row["num_injuries"]), int(row["num_fatalities"]),
         row["report_number"]
     ))
 
-crash_conn.commit()
-
 # --------------------------------------------------------------------
 # 6. Llenar Dimensiones + FactVehicleInvolment
 #    Aquí insertamos registro por cada fila del CSV (cada vehículo).
+#    driver_key / vehicle_key ya vienen resueltos por load_scd_dimensions()
+#    y junk_key_vehicle por load_junk_dimension().
 # --------------------------------------------------------------------
-for idx, row in df.iterrows():
-    date_key = get_date_key_vehicle(row["Crash Date/Time"], vehicle_cursor)
-    loc_key = get_location_key_vehicle(row, vehicle_cursor)
-    drv_key = get_driver_key(row, vehicle_cursor)
-    veh_key = get_vehicle_key(row, vehicle_cursor)
+def insert_fact_vehicle(row, cursor):
+    """Resolves the dimension keys of a CSV row and inserts its FactVehicleInvolment row"""
+    date_key = get_date_key_vehicle(row["crash_datetime"], cursor)
+    loc_key = get_location_key_vehicle(row, cursor)
+    drv_key = int(row["driver_key"])
+    veh_key = int(row["vehicle_key"])
+    junk_key = int(row["junk_key_vehicle"])
 
-    injury_security = row["Injury Severity"]
-    drive_at_fault_flag = row["Driver At Fault"]
-    circumstance = row["Circumstance"]
-
-    vehicle_cursor.execute("""
+    cursor.execute("""
         INSERT INTO FactVehicleInvolment(date_key_vehicle, location_key_vehicle,
-            driver_key, vehicle_key,
-            injury_security, drive_at_fault_flag, circumstance)
-        VALUES (%s, %s, %s, %s, %s, %s, %s)
-    """, (
-        date_key, loc_key, drv_key, veh_key,
-        injury_security, drive_at_fault_flag, circumstance
-    ))
+            driver_key, vehicle_key, junk_key_vehicle)
+        VALUES (%s, %s, %s, %s, %s)
+    """, (date_key, loc_key, drv_key, veh_key, junk_key))
+
+# --------------------------------------------------------------------
+# 6.1. Tablas staging de los reportes complementarios
+#    Los reportes de incidents y non-motorists todavía no tienen modelo
+#    dimensional: se cargan tal cual (todas las columnas como TEXT, con
+#    una columna source) para poder consultarlos y cruzarlos por
+#    report_number. Las columnas nuevas de un extracto se añaden con ALTER.
+#    - Los nombres de columna vienen de la cabecera del CSV y pueden ser
+#      palabras reservadas (order, group...): siempre van entre comillas.
+#    - Un archivo ya cargado se omite si su huella no cambió; si cambió,
+#      sus filas se reemplazan.
+# --------------------------------------------------------------------
+STAGING_TABLES = {
+    SCHEMA_INCIDENTS: ('crashDW', 'Staging_Incidents'),
+    SCHEMA_NON_MOTORISTS: ('vehicleDW', 'Staging_NonMotorists'),
+}
+
+def load_staging(conn, table, source, fingerprint, frame):
+    """
+    Replaces the rows of source in a staging table with frame, in one transaction
+    recorded as the 'staging' stage of source. Unlike the fact stages, a source that
+    changed since it was staged is simply staged again.
+    """
+    cursor = conn.cursor()
+    if CHECKPOINT_ENABLED:
+        _, status, stored_fingerprint, stored_rows = get_checkpoint(cursor, source, 'staging')
+        if status == 'done' and (stored_fingerprint, stored_rows) == (fingerprint, len(frame)):
+            print(f"Stage staging already completed for {source}, skipping")
+            return
+
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {table} (source TEXT)")
+    existing = list_columns(conn, table)
+    for col in frame.columns:
+        if col not in existing:
+            cursor.execute(f'ALTER TABLE {table} ADD COLUMN "{col}" TEXT')
+
+    cursor.execute(f"DELETE FROM {table} WHERE source = %s", (source,))
+    rows = frame.astype(object).where(frame.notna(), None)
+    bulk_insert(cursor, table, ['source'] + [f'"{col}"' for col in frame.columns],
+                [(source,) + row for row in rows.itertuples(index=False, name=None)])
+    if CHECKPOINT_ENABLED:
+        save_checkpoint(cursor, source, 'staging', fingerprint, len(frame), len(frame), None, 'done')
+    conn.commit()
+    print(f"{table}: {len(frame):,} rows staged from {source}")
 
-vehicle_conn.commit()
 # --------------------------------------------------------------------
-# 7. ¡Listo! Cerramos conexiones
+# 7. Orquestación de la carga de uno o varios archivos
 # --------------------------------------------------------------------
-crash_conn.close()
-vehicle_conn.close()
+def prepare_source(path, workers=None):
+    """
+    Detects the schema of a source file, then reads, profiles and transforms it.
+    Returns a dict with the file fingerprint, the cleaned rows ('df'), the FactCrash
+    summary ('fact_crash'), the DimJunk_Veh combinations ('junk'), the DQ profile and timings; for a companion report, the rows for its staging
+    table ('df'); or with 'skipped' set to the reason it cannot be loaded.
+    """
+    started = time.perf_counter()
+    # Taken before reading: a file rewritten meanwhile gets another fingerprint next time
+    fingerprint = file_fingerprint(path)
+    schema, reason = detect_schema(path)
+    if schema in STAGING_TABLES:
+        df = read_staging_csv(path)
+        return {
+            'source': path,
+            'fingerprint': fingerprint,
+            'schema': schema,
+            'df': df,
+            'bad_lines': df.attrs['bad_lines'],
+            'prepare_seconds': time.perf_counter() - started,
+        }
+    if schema != SCHEMA_DRIVERS:
+        return {'source': path, 'skipped': reason}
+
+    df = read_crash_csv(path)
+    bad_lines = df.attrs.get('bad_lines', 0)
+    # Perfilado de calidad sobre el DF crudo, antes de la limpieza
+    dq_profile = profile_dataframe(df)
+    df, factCrashDF = transform_crash_data(df, workers)
+    return {
+        'source': path,
+        'fingerprint': fingerprint,
+        'schema': schema,
+        'df': df,
+        'fact_crash': factCrashDF,
+        'junk': junk_combinations(df),
+        'bad_lines': bad_lines,
+        'dq_profile': dq_profile,
+        'dq_dimensions': profile_dimensions(df, factCrashDF),
+        'prepare_seconds': time.perf_counter() - started,
+    }
+
+# DataFrames de un archivo preparado que viajan como Arrow IPC desde el pool
+PREPARED_FRAMES = ('df', 'fact_crash', 'junk')
+
+def prepare_source_worker(path):
+    """
+    Pool entry point: prepares one file with a single-process transform (the pool
+    already uses every core) and returns its frames as Arrow IPC.
+    """
+    prepared = prepare_source(path, workers=1)
+    for key in PREPARED_FRAMES:
+        if key in prepared:
+            prepared[key] = to_ipc(prepared[key])
+    return prepared
+
+def source_stages(path):
+    """
+    Returns the (database, stage) checkpoints a source file goes through, from its
+    header; none for a file that cannot be loaded.
+    """
+    schema, _ = detect_schema(path)
+    if schema == SCHEMA_DRIVERS:
+        return [('crashDW', 'fact_crash'), ('vehicleDW', 'scd_dimensions'), ('vehicleDW', 'fact_vehicle')]
+    if schema in STAGING_TABLES:
+        return [(STAGING_TABLES[schema][0], 'staging')]
+    return []
+
+def source_is_loaded(path, cursors):
+    """
+    True when every stage of path is done with the file's current fingerprint, so it
+    needs neither reading nor transforming. A changed file is not loaded: its
+    stages report the change (see check_checkpoint and load_staging).
+    """
+    if not CHECKPOINT_ENABLED:
+        return False
+    fingerprint = file_fingerprint(path)
+    stages = source_stages(path)
+    return bool(stages) and all(
+        get_checkpoint(cursors[database], path, stage)[1:3] == ('done', fingerprint)
+        for database, stage in stages)
+
+def iter_prepared_sources(paths):
+    """
+    Yields the prepared sources in path order. A single file is prepared in-process
+    (its transform is parallel by partitions); several files are prepared in a pool of
+    INGEST_WORKERS processes, with at most INGEST_WORKERS files in flight so the
+    parsed frames waiting to be loaded stay bounded.
+    """
+    if len(paths) <= 1 or INGEST_WORKERS <= 1:
+        for path in paths:
+            yield prepare_source(path)
+        return
+
+    with ProcessPoolExecutor(max_workers=min(INGEST_WORKERS, len(paths))) as executor:
+        queued = iter(paths)
+        pending = deque(executor.submit(prepare_source_worker, path)
+                        for _, path in zip(range(INGEST_WORKERS), queued))
+        while pending:
+            prepared = pending.popleft().result()
+            next_path = next(queued, None)
+            if next_path is not None:
+                pending.append(executor.submit(prepare_source_worker, next_path))
+            for key in PREPARED_FRAMES:
+                if key in prepared:
+                    prepared[key] = from_ipc(prepared[key])
+            yield prepared
+
+def load_source(prepared, crash_conn, vehicle_conn):
+    """Loads one prepared source file into both warehouses (sections 5 and 6)"""
+    source, fingerprint = prepared['source'], prepared['fingerprint']
+    df, factCrashDF = prepared['df'], prepared['fact_crash']
+    crash_cursor = crash_conn.cursor()
+    vehicle_cursor = vehicle_conn.cursor()
+
+    print_dq_summary(prepared['dq_profile'], prepared['dq_dimensions'], prepared['bad_lines'])
+    report_path = write_dq_report(source, prepared['dq_profile'], prepared['dq_dimensions'],
+                                  prepared['bad_lines'])
+    print(f"DQ report written to {report_path}")
+    save_dq_profile(crash_cursor, source, prepared['dq_profile'], prepared['dq_dimensions'],
+                    prepared['bad_lines'])
+    crash_conn.commit()
+
+    # 5. Dimensiones + FactCrash
+    run_checkpointed_load(crash_conn, crash_cursor, source, fingerprint, 'fact_crash', factCrashDF,
+                          "report_number", insert_fact_crash, warm_crash_caches)
+
+    # 6. Dimensiones + FactVehicleInvolment
+    load_scd_dimensions(vehicle_conn, vehicle_cursor, source, fingerprint, df)
+    load_junk_dimension(vehicle_cursor, df, prepared['junk'])
+    vehicle_conn.commit()
+    run_checkpointed_load(vehicle_conn, vehicle_cursor, source, fingerprint, 'fact_vehicle', df,
+                          "Report Number", insert_fact_vehicle, warm_vehicle_caches)
+
+def load_sources(paths, crash_conn, vehicle_conn):
+    """
+    Prepares and loads every path in order, then rebuilds the aggregates.
+    Returns the (loaded, staged, skipped) source lists.
+    """
+    crash_cursor = crash_conn.cursor()
+    vehicle_cursor = vehicle_conn.cursor()
+
+    # 4. Los archivos ya cargados (mismas huellas) no se leen ni se envían al pool
+    loaded, staged, skipped = [], [], []
+    cursors = {'crashDW': crash_cursor, 'vehicleDW': vehicle_cursor}
+    done = {path for path in paths if source_is_loaded(path, cursors)}
+    for path in sorted(done):
+        print(f"{path}: already loaded, skipping")
+        skipped.append(path)
+    paths = [path for path in paths if path not in done]
+
+    # 4-6. Lectura y transformación concurrente, carga en orden
+    for number, prepared in enumerate(iter_prepared_sources(paths), start=1):
+        progress = f"[{number}/{len(paths)}] {prepared['source']}"
+        if 'skipped' in prepared:
+            print(f"{progress}: skipped ({prepared['skipped']})")
+            skipped.append(prepared['source'])
+            continue
+
+        if not (loaded or staged):
+            # The first batch of this run is about to become visible
+            clear_load_id(crash_conn)
+            clear_load_id(vehicle_conn)
+
+        if prepared['schema'] in STAGING_TABLES:
+            database, table = STAGING_TABLES[prepared['schema']]
+            print(f"{progress}: {prepared['schema']} report, {len(prepared['df']):,} rows, "
+                  f"{prepared['bad_lines']} bad lines, read in {prepared['prepare_seconds']:.1f}s")
+            load_staging(crash_conn if database == 'crashDW' else vehicle_conn, table,
+                         prepared['source'], prepared['fingerprint'], prepared['df'])
+            staged.append(prepared['source'])
+            continue
+
+        print(f"{progress}: {len(prepared['df']):,} rows, {prepared['bad_lines']} bad lines, "
+              f"transformed in {prepared['prepare_seconds']:.1f}s")
+        started = time.perf_counter()
+        load_source(prepared, crash_conn, vehicle_conn)
+        print(f"{progress}: loaded in {time.perf_counter() - started:.1f}s")
+        loaded.append(prepared['source'])
+
+    if loaded:
+        # Conteos pre-agregados por celda geohash (hotspots / consultas por radio)
+        build_crash_cell_aggregates(crash_cursor)
+        # Cubo OLAP sobre FactCrash (slice-and-dice sin leer la tabla de hechos)
+        build_crash_cube(crash_cursor, backend_of(crash_conn))
+    if loaded or staged:
+        bump_load_generation(crash_cursor)
+        crash_conn.commit()
+        bump_load_generation(vehicle_cursor)
+        vehicle_conn.commit()
+    return loaded, staged, skipped
+
+def main(patterns=None):
+    """
+    Loads every CSV matched by patterns (files, directories or glob patterns;
+    csv_path by default) into crashDW and vehicleDW.
+    """
+    # 1. Archivos a cargar
+    paths = expand_sources(patterns or [csv_path])
+    if not paths:
+        raise FileNotFoundError(f"No CSV files found for {patterns}")
+    print(f"Sources to load: {len(paths)}")
+
+    # 2. Conexiones a las dos bases de datos
+    try:
+        crash_conn = connect('crashDW')
+        vehicle_conn = connect('vehicleDW')
+
+    except Exception as e:
+        print(f"Error during database setup: {str(e)}")
+        raise
+
+    try:
+        # 3. Tablas
+        create_all_tables(crash_conn, vehicle_conn)
+        loaded, staged, skipped = load_sources(paths, crash_conn, vehicle_conn)
+    finally:
+        # 8. ¡Listo! Cerramos conexiones (una carga fallida deshace su lote en curso)
+        crash_conn.close()
+        vehicle_conn.close()
+
+    print(f"ETL completado. {len(loaded)} archivos cargados en crashDW y vehicleDW, "
+          f"{len(staged)} en tablas staging, {len(skipped)} omitidos.")
 
-print("ETL completado. Datos cargados en crashDW.db y vehicleDW.db.")
+if __name__ == "__main__":
+    # Uso: python dataWarehouse.py [archivo.csv | directorio | 'patrón*.csv' ...]
+    main(sys.argv[1:])
@@ -0,0 +1,263 @@
+import csv
+import glob
+import os
+import re
+import sys
+import warnings
+import pandas as pd
+
+try:
+    import pyarrow  # noqa: F401  (only needed for the multithreaded parser)
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Define data types explicitly for each column in the crash data CSV
+dtypes = {
+    # Identifiers and Reference Numbers - All should be strings to preserve leading zeros and special characters
+    'Report Number': str,
+    'Local Case Number': str,
+    'Person ID': str,
+    'Vehicle ID': str,
+    
+    # Text Fields - Agency and Location Information
+    'Agency Name': str,
+    'ACRS Report Type': str,
+    'Route Type': str,
+    'Road Name': str,
+    'Cross-Street Name': str,
+    'Off-Road Description': str,
+    'Municipality': str,
+    
+    # Date and Time
+    'Crash Date/Time': str,  # Will be parsed later using datetime
+    
+    # Categorical Fields - Crash Details
+    'Related Non-Motorist': str,
+    'Collision Type': str,
+    'Weather': str,
+    'Surface Condition': str,
+    'Light': str,
+    'Traffic Control': str,
+    
+    # Categorical Fields - Driver and Vehicle Information
+    'Driver Substance Abuse': str,
+    'Non-Motorist Substance Abuse': str,
+    'Driver At Fault': str,
+    'Injury Severity': str,
+    'Circumstance': str,
+    'Driver Distracted By': str,
+    'Drivers License State': str,
+    'Vehicle Damage Extent': str,
+    'Vehicle First Impact Location': str,
+    'Vehicle Body Type': str,
+    'Vehicle Movement': str,
+    'Vehicle Going Dir': str,
+    'Vehicle Make': str,
+    'Vehicle Model': str,
+    
+    # Numeric Fields - Use Int64 for nullable integers
+    'Speed Limit': 'Int64',
+    'Vehicle Year': 'Int64',
+    
+    # Boolean Fields - Will be standardized to Y/N
+    'Driverless Vehicle': str,
+    'Parked Vehicle': str,
+    
+    # Geographic Coordinates - Use float for decimal precision
+    'Latitude': float,
+    'Longitude': float,
+    
+    # Combined Location Field (appears to be a string representation of coordinates)
+    'Location': str
+}
+
+# Additional data cleaning configurations
+na_values = [
+    '', 'N/A', 'NA', 'UNKNOWN', 'NULL',  # Standard missing value indicators
+    'NONE', 'None', '0000', '0',         # Additional missing value variations
+    'NOT REPORTED', 'UNSPECIFIED'         # Domain-specific missing value indicators
+]
+
+# Date parsing format for reference
+date_format = "%m/%d/%Y %I:%M:%S %p"  # Example: "05/27/2021 07:40:00 PM"
+
+
+# Columns actually used by the dimension and fact builders.
+# 'Local Case Number' and 'Location' (a text copy of Latitude/Longitude) are never
+# loaded, so they are not parsed at all.
+USED_COLUMNS = [
+    'Report Number', 'Person ID', 'Vehicle ID',
+    'Agency Name', 'ACRS Report Type', 'Route Type', 'Road Name',
+    'Cross-Street Name', 'Off-Road Description', 'Municipality',
+    'Crash Date/Time',
+    'Related Non-Motorist', 'Collision Type', 'Weather', 'Surface Condition',
+    'Light', 'Traffic Control',
+    'Driver Substance Abuse', 'Non-Motorist Substance Abuse', 'Driver At Fault',
+    'Injury Severity', 'Circumstance', 'Driver Distracted By', 'Drivers License State',
+    'Vehicle Damage Extent', 'Vehicle First Impact Location', 'Vehicle Body Type',
+    'Vehicle Movement', 'Vehicle Going Dir', 'Vehicle Make', 'Vehicle Model',
+    'Speed Limit', 'Vehicle Year',
+    'Driverless Vehicle', 'Parked Vehicle',
+    'Latitude', 'Longitude'
+]
+
+# CSV parser: 'pyarrow' parses with one thread per core, 'c' is the pandas default
+CSV_ENGINE = 'pyarrow' if PYARROW_AVAILABLE else 'c'
+
+
+def find_malformed_records(csv_path):
+    """
+    Returns the numbers of the CSV records (0 is the header) whose field count differs
+    from the header's. Blank lines are not records. The numbering is the one the C
+    parser uses for skiprows, so quoted fields spanning several lines are handled.
+    """
+    with open(csv_path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        width = len(next(reader, []))
+        return [number for number, record in enumerate(reader, start=1)
+                if record and len(record) != width]
+
+
+def read_csv_checked(csv_path, engine, usecols, dtype):
+    """
+    Reads a CSV with the warehouse missing value rules. Lines with more or fewer
+    fields than the header are skipped by both engines; their number is kept in
+    df.attrs['bad_lines'].
+    """
+    if engine == 'pyarrow' and not PYARROW_AVAILABLE:
+        print("pyarrow is not installed, using the C parser")
+        engine = 'c'
+
+    # pyarrow rejects short and long rows by itself. With usecols the C parser pads
+    # short rows and truncates long ones without a warning, so they are found first
+    malformed = find_malformed_records(csv_path) if engine == 'c' else []
+
+    # Malformed lines are skipped with a ParserWarning; count them instead of
+    # letting them scroll by (the count ends up in the DQ profile)
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        df = pd.read_csv(
+            csv_path,
+            engine=engine,
+            usecols=usecols,
+            dtype=dtype,
+            keep_default_na=False,
+            na_values=na_values,
+            encoding='utf-8',
+            on_bad_lines='warn',
+            skiprows=malformed or None,
+        )
+    bad_lines = len(malformed) + sum(max(1, str(w.message).count('Skipping line'))
+                                     for w in caught if issubclass(w.category, pd.errors.ParserWarning))
+    if bad_lines:
+        print(f"Skipped {bad_lines} malformed lines in {csv_path}")
+    df.attrs['bad_lines'] = bad_lines
+    return df
+
+
+def read_crash_csv(csv_path, engine=None, usecols=USED_COLUMNS):
+    """
+    Reads a crash reporting CSV with the warehouse dtypes and missing value rules.
+    Only the columns in usecols are parsed. Falls back to the C engine when pyarrow
+    is not installed. Lines with more or fewer fields than the header are skipped
+    by both engines; their number is kept in df.attrs['bad_lines'].
+    """
+    df = read_csv_checked(csv_path, engine or CSV_ENGINE, usecols,
+                          {col: dtypes[col] for col in usecols})
+    # Keep the column order stable regardless of the parser
+    bad_lines = df.attrs['bad_lines']
+    df = df[list(usecols)]
+    df.attrs['bad_lines'] = bad_lines
+    return df
+
+
+# --------------------------------------------------------------------
+# Descubrimiento de archivos para la carga multi-archivo
+#    - Se aceptan archivos, directorios (todos sus .csv) y patrones glob.
+#    - El esquema de cada archivo se detecta por su cabecera: solo los
+#      reportes de conductores (drivers) tienen el modelo estrella del DW;
+#      incidents y non-motorists se cargan tal cual, como texto, en tablas
+#      staging (ver read_staging_csv).
+# --------------------------------------------------------------------
+SCHEMA_DRIVERS = 'drivers'
+SCHEMA_INCIDENTS = 'incidents'
+SCHEMA_NON_MOTORISTS = 'non_motorists'
+
+# Columns that only appear in the companion Crash Reporting datasets
+NON_MOTORIST_MARKERS = ['Pedestrian Type', 'Pedestrian Movement', 'Pedestrian Location']
+INCIDENT_MARKERS = ['Hit/Run', 'Mile Point', 'Number of Lanes', 'Lane Direction']
+
+
+def expand_sources(patterns):
+    """
+    Expands files, directories and glob patterns into a sorted list of unique CSV paths.
+    Monthly extracts named by date therefore load in chronological order. Paths are
+    made absolute with symlinks resolved, so the same file is one source (and has one
+    set of checkpoints) however it is spelled.
+    """
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(glob.glob(os.path.join(pattern, '*.csv')))
+        elif glob.has_magic(pattern):
+            paths.extend(glob.glob(pattern))
+        else:
+            paths.append(pattern)
+    return sorted(set(os.path.realpath(path) for path in paths))
+
+
+def detect_schema(csv_path):
+    """
+    Returns (schema, reason) for a CSV from its header: SCHEMA_DRIVERS when it has every
+    column in USED_COLUMNS, otherwise the companion dataset it looks like. A file that
+    is none of them gets (None, why it cannot be loaded).
+    """
+    header = pd.read_csv(csv_path, nrows=0, encoding='utf-8').columns
+    missing = [col for col in USED_COLUMNS if col not in header]
+    if not missing:
+        return SCHEMA_DRIVERS, None
+    if any(col in header for col in NON_MOTORIST_MARKERS):
+        return SCHEMA_NON_MOTORISTS, None
+    if any(col in header for col in INCIDENT_MARKERS):
+        return SCHEMA_INCIDENTS, None
+    return None, f"missing columns: {', '.join(missing)}"
+
+
+def staging_column(name):
+    """Column name of a CSV header in a staging table: lowercase words joined by '_'"""
+    return re.sub(r'[^a-z0-9]+', '_', name.lower()).strip('_')
+
+
+def read_staging_csv(csv_path):
+    """
+    Reads a companion report (incidents, non-motorists) for its staging table: every
+    column as text, with the warehouse missing value rules and malformed line
+    handling, and the columns renamed with staging_column(). Always uses the C
+    parser: pandas' pyarrow engine infers numbers and converts them back to text
+    ('1.50' -> '1.5', '0123' -> '123.0').
+    """
+    df = read_csv_checked(csv_path, 'c', None, str)
+    bad_lines = df.attrs['bad_lines']
+    df = df.rename(columns=staging_column)
+    if df.columns.duplicated().any():
+        raise ValueError(f"{csv_path}: columns {sorted(set(df.columns[df.columns.duplicated()]))} "
+                         f"collide once normalized")
+    df.attrs['bad_lines'] = bad_lines
+    return df
+
+
+def check_engine_parity(csv_path):
+    """
+    Parses csv_path with the C and the pyarrow engines and checks that both produce
+    the same values and dtypes. Raises AssertionError on the first difference.
+    """
+    expected = read_crash_csv(csv_path, engine='c')
+    result = read_crash_csv(csv_path, engine='pyarrow')
+    pd.testing.assert_frame_equal(result, expected)
+    print(f"Parity OK: {len(result)} rows, {len(result.columns)} columns")
+
+
+if __name__ == "__main__":
+    # Uso: python ingest.py <archivo.csv>
+    check_engine_parity(sys.argv[1] if len(sys.argv) > 1 else "data/Crash_Reporting_-_Drivers_Data.csv")
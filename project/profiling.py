@@ -0,0 +1,203 @@
+import hashlib
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+
+from transform import BOOLEAN_COLUMNS, TRUE_VALUES, DATE_FORMAT
+
+# --------------------------------------------------------------------
+# Perfilado de calidad de datos (DQ)
+#    - Se calcula sobre el DataFrame crudo ya leído (sin releer el CSV),
+#      antes de que los limpiadores reescriban los valores.
+#    - Por columna: nulos, valores coercionados por la limpieza, valores
+#      fuera de rango, cardinalidad y valores más frecuentes.
+#    - Por dimensión: número de miembros distintos (tamaño de su caché).
+# --------------------------------------------------------------------
+DQ_REPORT_DIR = "reports"
+TOP_VALUES = 5
+
+# Valid ranges; values outside are counted as out of range
+# (Vehicle Year outside the range is rewritten to 0 by the cleaners)
+RANGE_RULES = {
+    'Vehicle Year': (1900, datetime.now().year),
+    'Speed Limit': (0, 85),
+    'Latitude': (-90, 90),
+    'Longitude': (-180, 180),
+}
+
+FALSE_VALUES = ['N', 'NO', 'FALSE', '0']
+
+# Columns forming each dimension member, as in the dimension lookups of dataWarehouse.py
+CRASH_DIMENSIONS = {
+    'DimLocation_Crash': ['Route Type', 'Road Name', 'Cross-Street Name',
+                          'Off-Road Description', 'Municipality', 'Latitude', 'Longitude'],
+    'DimCondition_Crash': ['Weather', 'Surface Condition', 'Light', 'Traffic Control'],
+    'DimCrashType': ['ACRS Report Type', 'Collision Type', 'Related Non-Motorist', 'Agency Name'],
+}
+VEHICLE_DIMENSIONS = {
+    'DimLocation_Veh': ['Route Type', 'Road Name', 'Cross-Street Name', 'Municipality',
+                        'Latitude', 'Longitude'],
+    # SCD2 dimensions (scd.py): one member per natural key, plus one row per later version
+    'DimDriver': ['Person ID'],
+    'DimVehicle': ['Vehicle ID'],
+    'DimJunk_Veh': ['Injury Severity', 'Driver At Fault', 'Circumstance'],
+}
+
+
+def profile_dataframe(df):
+    """
+    Profiles every column of the raw CSV frame.
+    Returns a DataFrame with one row per column: null_count, null_rate, coerced_count
+    (values the cleaners will rewrite), out_of_range_count, distinct_count, top_values.
+    """
+    row_count = len(df)
+    null_counts = df.isna().sum()
+    distinct_counts = df.nunique()
+
+    records = []
+    for col in df.columns:
+        values = df[col]
+        nulls = int(null_counts[col])
+        out_of_range = 0
+
+        if col in RANGE_RULES:
+            low, high = RANGE_RULES[col]
+            numeric = pd.to_numeric(values, errors='coerce')
+            out_of_range = int(((numeric < low) | (numeric > high)).sum())
+
+        if col == 'Vehicle Year':
+            # Missing and out-of-range years become 0
+            coerced = nulls + out_of_range
+        elif col in BOOLEAN_COLUMNS:
+            # Missing and unrecognized indicators become 'N'
+            known = values.str.upper().isin(TRUE_VALUES + FALSE_VALUES)
+            coerced = int((~known).sum())
+        elif col == 'Crash Date/Time':
+            # Unparseable dates get no date key
+            parsed = pd.to_datetime(values, format=DATE_FORMAT, errors='coerce')
+            coerced = int(parsed.isna().sum())
+        elif values.dtype == 'float64' or col in RANGE_RULES:
+            # Missing numbers become 0
+            coerced = nulls
+        else:
+            # Missing strings become '' and surrounding whitespace is stripped
+            present = values.dropna()
+            coerced = nulls + int((present != present.str.strip()).sum())
+
+        top = values.value_counts().head(TOP_VALUES)
+        records.append({
+            'column_name': col,
+            'row_count': row_count,
+            'null_count': nulls,
+            'null_rate': round(nulls / row_count, 4) if row_count else 0.0,
+            'coerced_count': int(coerced),
+            'out_of_range_count': out_of_range,
+            'distinct_count': int(distinct_counts[col]),
+            'top_values': json.dumps({str(k): int(v) for k, v in top.items()}),
+        })
+    return pd.DataFrame(records)
+
+
+def profile_dimensions(clean_df, fact_crash_df):
+    """
+    Counts the distinct members of each dimension before loading, i.e. the final
+    size of its lookup cache. Crash dimensions come from the FactCrash summary,
+    vehicle dimensions from the cleaned rows.
+    """
+    cardinalities = {
+        'DimDateTime_Crash': int(fact_crash_df['crash_datetime'].dt.floor('h').nunique()),
+        'DimDateTime_Veh': int(clean_df['crash_datetime'].dt.floor('h').nunique()),
+    }
+    for name, columns in CRASH_DIMENSIONS.items():
+        cardinalities[name] = int(len(fact_crash_df[columns].drop_duplicates()))
+    for name, columns in VEHICLE_DIMENSIONS.items():
+        cardinalities[name] = int(len(clean_df[columns].drop_duplicates()))
+    return cardinalities
+
+
+def dq_report_path(source):
+    """
+    Returns the report file of a source: its base name plus a hash of its normalized
+    full path, so extracts with the same name in different directories do not
+    overwrite each other's report.
+    """
+    source = os.path.realpath(source)
+    digest = hashlib.sha256(source.encode('utf-8')).hexdigest()[:8]
+    return os.path.join(DQ_REPORT_DIR, f"dq_{os.path.splitext(os.path.basename(source))[0]}_{digest}.json")
+
+
+def write_dq_report(source, profile, cardinalities, bad_lines=0):
+    """Writes the profile as JSON to DQ_REPORT_DIR and returns the file path"""
+    os.makedirs(DQ_REPORT_DIR, exist_ok=True)
+    path = dq_report_path(source)
+    report = {
+        'source': source,
+        'profiled_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'bad_lines': bad_lines,
+        'columns': [dict(record, top_values=json.loads(record['top_values']))
+                    for record in profile.to_dict(orient='records')],
+        'dimension_cardinality': cardinalities,
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    return path
+
+
+def create_dq_table(cursor):
+    """Creates the table that keeps the DQ profile of every loaded source"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS DQProfile (
+        source TEXT,
+        profiled_at TEXT,
+        kind TEXT,
+        name TEXT,
+        row_count INTEGER,
+        null_count INTEGER,
+        null_rate REAL,
+        coerced_count INTEGER,
+        out_of_range_count INTEGER,
+        distinct_count INTEGER,
+        top_values TEXT
+    )
+    """)
+
+
+def save_dq_profile(cursor, source, profile, cardinalities, bad_lines=0):
+    """
+    Replaces the stored profile of source: one 'column' row per CSV column,
+    one 'dimension' row per dimension and a 'bad_lines' row for skipped lines.
+    """
+    profiled_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+    cursor.execute("DELETE FROM DQProfile WHERE source = %s", (source,))
+
+    rows = [
+        (source, profiled_at, 'column', r['column_name'], r['row_count'], r['null_count'],
+         r['null_rate'], r['coerced_count'], r['out_of_range_count'], r['distinct_count'],
+         r['top_values'])
+        for r in profile.to_dict(orient='records')
+    ]
+    rows += [
+        (source, profiled_at, 'dimension', name, None, None, None, None, None, count, None)
+        for name, count in cardinalities.items()
+    ]
+    rows.append((source, profiled_at, 'bad_lines', 'CSV', bad_lines, None, None, None, None, None, None))
+    cursor.executemany("""
+        INSERT INTO DQProfile(source, profiled_at, kind, name, row_count, null_count, null_rate,
+            coerced_count, out_of_range_count, distinct_count, top_values)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
+    """, rows)
+
+
+def print_dq_summary(profile, cardinalities, bad_lines=0):
+    """Prints the columns with rewritten or out-of-range values and the dimension sizes"""
+    print("\n=== CALIDAD DE DATOS ===")
+    print(f"  Líneas descartadas por formato: {bad_lines}")
+    affected = profile[(profile['coerced_count'] > 0) | (profile['out_of_range_count'] > 0)]
+    for _, row in affected.iterrows():
+        print(f"  {row['column_name']}: nulos {row['null_rate']:.1%}, "
+              f"coercionados {row['coerced_count']:,}, fuera de rango {row['out_of_range_count']:,}")
+    print("  Cardinalidad de dimensiones:")
+    for name, count in cardinalities.items():
+        print(f"    {name}: {count:,}")
@@ -0,0 +1,339 @@
+import argparse
+import json
+import os
+import re
+import time
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from analytical_queries import load_queries, get_connection, close_connections
+from backends import DW_BACKEND, backend_of, list_index_columns
+
+# --------------------------------------------------------------------
+# Perfilado de ejecución de las consultas analíticas
+#    - Ejecuta cada consulta de docs/analytitcalQueries.md varias veces
+#      (sin la caché de analytical_queries.py) y calcula percentiles de
+#      latencia.
+#    - Obtiene el plan real de cada una:
+#        postgres: EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)
+#        duckdb:   EXPLAIN (ANALYZE, FORMAT JSON)
+#        sqlite:   EXPLAIN QUERY PLAN (sin tiempos ni filas reales)
+#    - Marca los escaneos secuenciales y las columnas de joins/filtros de
+#      esas tablas que no encabezan ningún índice.
+#    - Guarda cada ejecución como JSON en PROFILE_DIR para comparar
+#      antes/después de cambios de esquema o del ETL.
+# --------------------------------------------------------------------
+PROFILE_DIR = os.path.join("reports", "query_profiles")
+PROFILE_RUNS = 10
+PROFILE_WARMUP_RUNS = 1
+PERCENTILES = (50, 90, 95, 99)
+
+TABLE_REFERENCE = re.compile(
+    r'\b(?:FROM|JOIN)\s+(\w+)(?:\s+(?:AS\s+)?(?!(?:ON|JOIN|WHERE|GROUP|ORDER|LIMIT|LEFT|RIGHT|INNER|FULL|CROSS)\b)(\w+))?',
+    re.IGNORECASE)
+PREDICATE_CLAUSE = re.compile(
+    r'\b(?:ON|WHERE)\b(.*?)(?=\b(?:JOIN|LEFT|RIGHT|INNER|FULL|CROSS|GROUP|ORDER|LIMIT|HAVING)\b|\)|$)',
+    re.IGNORECASE | re.DOTALL)
+CTE_NAME = re.compile(r'(?:\bWITH|,)\s+(\w+)\s+AS\s*\(', re.IGNORECASE)
+COLUMN_REFERENCE = re.compile(r'\b(\w+)\.(\w+)\b')
+SQLITE_SCAN = re.compile(r'^(SCAN|SEARCH) (?:TABLE )?(\w+)(.*)$')
+
+
+def table_aliases(sql):
+    """
+    Returns {alias or table name: table name} for the FROM/JOIN tables of a query,
+    in lowercase. Common table expressions are not tables and are left out.
+    """
+    ctes = {name.lower() for name in CTE_NAME.findall(sql)}
+    aliases = {}
+    for table, alias in TABLE_REFERENCE.findall(sql):
+        if table.lower() in ctes:
+            continue
+        aliases[table.lower()] = table.lower()
+        if alias:
+            aliases[alias.lower()] = table.lower()
+    return aliases
+
+
+def predicate_columns(sql):
+    """
+    Returns {table: set of columns} referenced as alias.column in the ON and WHERE
+    clauses of a query (table and column names in lowercase).
+    """
+    aliases = table_aliases(sql)
+    columns = {}
+    for clause in PREDICATE_CLAUSE.findall(sql):
+        for alias, column in COLUMN_REFERENCE.findall(clause):
+            if alias.lower() in aliases:
+                columns.setdefault(aliases[alias.lower()], set()).add(column.lower())
+    return columns
+
+
+def time_query(conn, sql, runs=PROFILE_RUNS, warmup_runs=PROFILE_WARMUP_RUNS):
+    """Runs sql warmup_runs + runs times and returns the latencies (ms) of the timed runs"""
+    cursor = conn.cursor()
+    latencies = []
+    for run in range(warmup_runs + runs):
+        start = time.perf_counter()
+        cursor.execute(sql)
+        cursor.fetchall()
+        elapsed = (time.perf_counter() - start) * 1000
+        conn.commit()
+        if run >= warmup_runs:
+            latencies.append(elapsed)
+    return latencies
+
+
+def latency_summary(latencies):
+    """Min, mean, max and PERCENTILES of a list of latencies, rounded to 0.01 ms"""
+    values = np.array(latencies)
+    summary = {'min_ms': values.min(), 'mean_ms': values.mean(), 'max_ms': values.max()}
+    for p in PERCENTILES:
+        summary[f"p{p}_ms"] = np.percentile(values, p)
+    return {key: round(float(value), 2) for key, value in summary.items()}
+
+
+# --------------------------------------------------------------------
+# Planes de ejecución
+#    Cada explain_* devuelve (plan, scans, totals):
+#      plan:   el plan tal como lo entrega el motor (para guardarlo)
+#      scans:  [{'table', 'type' ('seq' | 'index'), 'rows'}]
+#      totals: métricas globales del plan (tiempos, buffers, bytes leídos)
+# --------------------------------------------------------------------
+def explain_postgres(cursor, sql):
+    cursor.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}")
+    plan = cursor.fetchone()[0]
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    root = plan[0]
+
+    scans = []
+    def walk(node):
+        node_type = node['Node Type']
+        if 'Relation Name' in node and node_type.endswith('Scan'):
+            scans.append({
+                'table': node['Relation Name'].lower(),
+                'type': 'seq' if 'Seq Scan' in node_type else 'index',
+                'rows': int(node.get('Actual Rows', 0) * node.get('Actual Loops', 1)),
+            })
+        for child in node.get('Plans', []):
+            walk(child)
+    walk(root['Plan'])
+
+    totals = {
+        'planning_ms': root.get('Planning Time'),
+        'execution_ms': root.get('Execution Time'),
+        'shared_hit_blocks': root['Plan'].get('Shared Hit Blocks'),
+        'shared_read_blocks': root['Plan'].get('Shared Read Blocks'),
+    }
+    return plan, scans, totals
+
+
+def explain_duckdb(cursor, sql):
+    cursor.execute(f"EXPLAIN (ANALYZE, FORMAT JSON) {sql}")
+    plan = json.loads(cursor.fetchone()[1])
+
+    scans = []
+    def walk(node):
+        if node.get('operator_type') == 'TABLE_SCAN':
+            info = node.get('extra_info', {})
+            scans.append({
+                'table': info.get('Table', '').split('.')[-1].lower(),
+                'type': 'index' if info.get('Type') == 'Index Scan' else 'seq',
+                'rows': node.get('operator_rows_scanned'),
+            })
+        for child in node.get('children', []):
+            walk(child)
+    walk(plan)
+
+    totals = {
+        'execution_ms': round(plan.get('latency', 0) * 1000, 3),
+        'cpu_ms': round(plan.get('cpu_time', 0) * 1000, 3),
+        'bytes_read': plan.get('total_bytes_read'),
+        'rows_scanned': plan.get('cumulative_rows_scanned'),
+    }
+    return plan, scans, totals
+
+
+def explain_sqlite(cursor, sql):
+    cursor.execute(f"EXPLAIN QUERY PLAN {sql}")
+    plan = [row[3] for row in cursor.fetchall()]
+
+    aliases = table_aliases(sql)
+    scans = []
+    for detail in plan:
+        match = SQLITE_SCAN.match(detail)
+        # CTEs and subqueries are scanned too, but they are not tables
+        if not match or match.group(2).lower() not in aliases:
+            continue
+        uses_index = match.group(1) == 'SEARCH' or 'INDEX' in match.group(3)
+        scans.append({
+            'table': aliases[match.group(2).lower()],
+            'type': 'index' if uses_index else 'seq',
+            'rows': None,
+        })
+    return plan, scans, {}
+
+
+EXPLAINERS = {
+    'postgres': explain_postgres,
+    'duckdb': explain_duckdb,
+    'sqlite': explain_sqlite,
+}
+
+
+def diagnose(sql, scans, indexed):
+    """
+    Flags the sequential scans of a plan and, for each sequentially scanned table,
+    the join/filter columns of the query that do not lead any index of that table.
+    """
+    flags = []
+    referenced = predicate_columns(sql)
+    for table in sorted({scan['table'] for scan in scans if scan['type'] == 'seq'}):
+        rows = [scan['rows'] for scan in scans if scan['table'] == table and scan['rows'] is not None]
+        flags.append({'kind': 'seq_scan', 'table': table, 'rows': sum(rows) if rows else None})
+        for column in sorted(referenced.get(table, set()) - indexed.get(table, set())):
+            flags.append({'kind': 'missing_index', 'table': table, 'column': column})
+    return flags
+
+
+def profile_query(query, runs=PROFILE_RUNS):
+    """Times one analytical query and explains its plan; returns its profile record"""
+    conn = get_connection(query['database'])
+    latencies = time_query(conn, query['sql'], runs)
+
+    cursor = conn.cursor()
+    plan, scans, totals = EXPLAINERS[backend_of(conn)](cursor, query['sql'])
+    indexed = list_index_columns(conn)
+    conn.commit()
+
+    return {
+        'number': query['number'],
+        'title': query['title'],
+        'database': query['database'],
+        'latency': latency_summary(latencies),
+        'samples_ms': [round(value, 3) for value in latencies],
+        'plan_totals': totals,
+        'scans': scans,
+        'flags': diagnose(query['sql'], scans, indexed),
+        'plan': plan,
+    }
+
+
+def profile_workload(names=None, runs=PROFILE_RUNS, label=None):
+    """
+    Profiles the named analytical queries (all of them by default) against both
+    warehouses. Returns the run report: backend, timestamp, label, runs and one
+    record per query.
+    """
+    queries = load_queries()
+    report = {
+        'backend': DW_BACKEND,
+        'profiled_at': datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        'label': label,
+        'runs': runs,
+        'queries': {},
+    }
+    try:
+        for name in names or list(queries):
+            report['queries'][name] = profile_query(queries[name], runs)
+    finally:
+        close_connections()
+    return report
+
+
+def write_profile(report):
+    """Writes a run report to PROFILE_DIR and returns the file path"""
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.strptime(report['profiled_at'], "%Y-%m-%d %H:%M:%S").strftime("%Y%m%d_%H%M%S")
+    suffix = f"_{report['label']}" if report['label'] else ''
+    path = os.path.join(PROFILE_DIR, f"{report['backend']}_{stamp}{suffix}.json")
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2, ensure_ascii=False, default=str)
+    return path
+
+
+def format_flag(flag):
+    if flag['kind'] == 'seq_scan':
+        rows = f" ({flag['rows']:,} filas)" if flag['rows'] is not None else ''
+        return f"escaneo secuencial de {flag['table']}{rows}"
+    return f"sin índice: {flag['table']}({flag['column']})"
+
+
+def print_profile(report):
+    """Prints the latency percentiles and flags of every profiled query"""
+    print(f"\n=== PERFIL DE CONSULTAS ({report['backend']}, {report['runs']} ejecuciones) ===")
+    for name, record in report['queries'].items():
+        latency = record['latency']
+        print(f"\n{record['number']}. {record['title']} ({record['database']})")
+        print("  " + ", ".join(f"{key[:-3]} {value:.2f} ms" for key, value in latency.items()))
+        for flag in record['flags']:
+            print(f"  - {format_flag(flag)}")
+
+
+def compare_profiles(old_path, new_path):
+    """
+    Compares two stored run reports. Returns a DataFrame with, per query present in
+    both, the p50/p95 latencies, their change and the flags added or removed.
+    """
+    with open(old_path, encoding='utf-8') as f:
+        old = json.load(f)
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)
+
+    rows = []
+    for name, record in new['queries'].items():
+        if name not in old['queries']:
+            continue
+        before = old['queries'][name]
+        before_flags = {format_flag(flag) for flag in before['flags']}
+        after_flags = {format_flag(flag) for flag in record['flags']}
+        rows.append({
+            'query': record['number'],
+            'name': name,
+            'p50_before_ms': before['latency']['p50_ms'],
+            'p50_after_ms': record['latency']['p50_ms'],
+            'p50_change': round(record['latency']['p50_ms'] / before['latency']['p50_ms'] - 1, 4)
+                          if before['latency']['p50_ms'] else None,
+            'p95_before_ms': before['latency']['p95_ms'],
+            'p95_after_ms': record['latency']['p95_ms'],
+            'new_flags': sorted(after_flags - before_flags),
+            'resolved_flags': sorted(before_flags - after_flags),
+        })
+    return pd.DataFrame(rows)
+
+
+def print_comparison(comparison):
+    print("\n=== COMPARACIÓN DE PERFILES ===")
+    for _, row in comparison.iterrows():
+        change = f"{row['p50_change']:+.1%}" if pd.notna(row['p50_change']) else 'n/a'
+        print(f"\n{row['query']}. {row['name']}")
+        print(f"  p50 {row['p50_before_ms']:.2f} -> {row['p50_after_ms']:.2f} ms ({change}), "
+              f"p95 {row['p95_before_ms']:.2f} -> {row['p95_after_ms']:.2f} ms")
+        for flag in row['new_flags']:
+            print(f"  + {flag}")
+        for flag in row['resolved_flags']:
+            print(f"  - {flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Perfila las consultas analíticas del warehouse")
+    parser.add_argument('names', nargs='*', help="consultas a perfilar (por defecto, todas)")
+    parser.add_argument('--runs', type=int, default=PROFILE_RUNS, help="ejecuciones medidas por consulta")
+    parser.add_argument('--label', help="etiqueta añadida al nombre del archivo de resultados")
+    parser.add_argument('--compare', nargs=2, metavar=('ANTES', 'DESPUES'),
+                        help="compara dos archivos de resultados en lugar de perfilar")
+    args = parser.parse_args()
+
+    if args.compare:
+        print_comparison(compare_profiles(*args.compare))
+        return
+
+    report = profile_workload(args.names, args.runs, args.label)
+    print_profile(report)
+    print(f"\nPerfil guardado en {write_profile(report)}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,385 @@
+import pandas as pd
+
+from backends import bulk_insert
+
+# --------------------------------------------------------------------
+# Dimensiones lentamente cambiantes (SCD tipo 2)
+#    - Una fila por versión de cada clave natural (vehicle_id / person_id),
+#      con effective_from / effective_to y un flag is_current.
+#    - Las versiones se calculan vectorizadas con pandas y se fusionan con
+#      la dimensión en bloque: tabla staging + UPDATE / INSERT set-based.
+#    - Las fechas se guardan como TEXT 'YYYY-MM-DD HH:MM:SS' (igual que
+#      date_value), que ordena cronológicamente.
+# --------------------------------------------------------------------
+SCD_DIMENSIONS = {
+    'DimDriver': {
+        'surrogate_key': 'driver_key',
+        'natural_key': ('person_id', 'Person ID'),
+        'attributes': [
+            ('driver_substance_abuse', 'Driver Substance Abuse'),
+            ('non_motorist_substance_abuse', 'Non-Motorist Substance Abuse'),
+            ('driver_distracted_by', 'Driver Distracted By'),
+            ('drivers_license_state', 'Drivers License State'),
+            ('driver_at_fault', 'Driver At Fault'),
+        ],
+    },
+    'DimVehicle': {
+        'surrogate_key': 'vehicle_key',
+        'natural_key': ('vehicle_id', 'Vehicle ID'),
+        'attributes': [
+            ('vehicle_damage_extent', 'Vehicle Damage Extent'),
+            ('vehicle_first_impact_location', 'Vehicle First Impact Location'),
+            ('vehicle_body_type', 'Vehicle Body Type'),
+            ('vehicle_movement', 'Vehicle Movement'),
+            ('vehicle_going_dir', 'Vehicle Going Dir'),
+            ('speed_limit', 'Speed Limit'),
+            ('driverless_vehicle', 'Driverless Vehicle'),
+            ('parked_vehicle', 'Parked Vehicle'),
+            ('vehicle_year', 'Vehicle Year'),
+            ('vehicle_make', 'Vehicle Make'),
+            ('vehicle_model', 'Vehicle Model'),
+        ],
+        # Y/N indicators stored as BOOLEAN columns
+        'boolean_attributes': ['driverless_vehicle', 'parked_vehicle'],
+    },
+}
+
+# Fact table whose rows reference the versions, and the date dimension that
+# gives the crash date (hour) of each fact
+SCD_FACT = {
+    'table': 'FactVehicleInvolment',
+    'id': 'fact_vehicle_id',
+    'date_key': 'date_key_vehicle',
+    'date_dimension': 'DimDateTime_Veh',
+}
+
+# Rows without a crash date are versioned as if they were the oldest
+UNKNOWN_DATE = '1900-01-01 00:00:00'
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+# Order of the entries of a key's timeline dated at the same time (see merge_late_versions)
+EXISTING, SEEN, NEW = 0, 1, 2
+
+
+def build_observations(df, dimension):
+    """
+    Returns one row per distinct (natural key, attributes, crash date) of the cleaned
+    rows, with the dimension's column names and the date as effective_from, ordered
+    by natural key and date.
+    """
+    spec = SCD_DIMENSIONS[dimension]
+    key_col, key_src = spec['natural_key']
+    attr_cols = [col for col, _ in spec['attributes']]
+
+    observations = pd.DataFrame({key_col: df[key_src].astype(str)})
+    for col, src in spec['attributes']:
+        observations[col] = df[src]
+    for col in spec.get('boolean_attributes', []):
+        observations[col] = observations[col] == 'Y'
+    if 'speed_limit' in attr_cols:
+        observations['speed_limit'] = pd.to_numeric(observations['speed_limit'], errors='coerce').fillna(0).astype(int)
+    observations['effective_from'] = df['crash_datetime'].dt.strftime(DATE_FORMAT).fillna(UNKNOWN_DATE)
+
+    observations = observations.drop_duplicates()
+    return observations.sort_values([key_col, 'effective_from'], kind='stable')
+
+
+def build_versions(df, dimension):
+    """
+    Collapses the cleaned rows into SCD2 versions: per natural key, ordered by crash
+    date, a new version starts whenever an attribute changes. Returns a frame with
+    the dimension's column names plus effective_from and effective_to (None for the
+    latest version of each key).
+    """
+    spec = SCD_DIMENSIONS[dimension]
+    key_col = spec['natural_key'][0]
+    attr_cols = [col for col, _ in spec['attributes']]
+
+    versions = build_observations(df, dimension)
+    previous = versions.groupby(key_col)[attr_cols].shift(1)
+    changed = previous.isna().all(axis=1) | (versions[attr_cols] != previous).any(axis=1)
+    versions = versions[changed].copy()
+
+    versions['effective_to'] = versions.groupby(key_col)['effective_from'].shift(-1)
+    versions['effective_to'] = versions['effective_to'].astype(object).where(versions['effective_to'].notna(), None)
+    return versions
+
+
+def same_attributes(left, right, attr_cols):
+    """True when two version rows have the same attributes (NULLs compare equal)"""
+    return all(left[col] == right[col] or (pd.isna(left[col]) and pd.isna(right[col]))
+               for col in attr_cols)
+
+
+def merge_timeline(versions, attr_cols):
+    """
+    Collapses the timeline of one natural key (EXISTING versions, SEEN fact dates and
+    NEW rows, ordered by date and kind) into the versions to keep:
+      - an entry equal to the version before it adds nothing, except an existing
+        version after a new one, which now starts at the new one's date,
+      - a SEEN or NEW entry dated exactly at the start of the version before it, but
+        with other attributes, conflicts with it and the existing data is kept.
+    Returns (kept entries, conflicting NEW entries).
+    """
+    kept, conflicts = [], 0
+    for version in versions:
+        previous = kept[-1] if kept else None
+        if previous is None or (version['kind'] == EXISTING and previous['kind'] == EXISTING):
+            kept.append(version)
+        elif version['kind'] != EXISTING and previous['effective_from'] == version['effective_from']:
+            conflicts += version['kind'] == NEW and not same_attributes(previous, version, attr_cols)
+        elif same_attributes(previous, version, attr_cols):
+            if version['kind'] == EXISTING:
+                kept[-1] = dict(version, effective_from=previous['effective_from'])
+        else:
+            kept.append(version)
+    return kept, conflicts
+
+
+def merge_late_versions(cursor, dimension, stage, observations):
+    """
+    Merges the rows of the keys that arrive late, i.e. with a row dated no later than
+    the last time the key was seen (the start of its current version or the date of
+    one of its facts), into their history, and removes those keys from the staging
+    table. Each such key's timeline is rebuilt from its existing versions, the dates
+    of its facts (with the attributes of the version they reference) and the new
+    rows (see merge_timeline): existing versions get new dates, and new versions,
+    including a copy of an existing one when a new row splits it, are inserted.
+    The facts of those keys are then re-pointed (see repoint_facts).
+    Returns (inserted, conflicts, repointed).
+    """
+    spec = SCD_DIMENSIONS[dimension]
+    key_col = spec['natural_key'][0]
+    surrogate = spec['surrogate_key']
+    attr_cols = [col for col, _ in spec['attributes']]
+    columns = [key_col] + attr_cols + ['effective_from']
+    fact_versions = f"""
+        FROM {SCD_FACT['table']} AS f
+        JOIN {dimension} AS d ON f.{surrogate} = d.{surrogate}
+        LEFT JOIN {SCD_FACT['date_dimension']} AS dt ON f.{SCD_FACT['date_key']} = dt.{SCD_FACT['date_key']}
+    """
+
+    cursor.execute(f"""
+        SELECT {key_col}, MAX(seen) FROM (
+            SELECT {key_col}, effective_from AS seen FROM {dimension}
+            WHERE {key_col} IN (SELECT {key_col} FROM {stage})
+            UNION ALL
+            SELECT d.{key_col}, COALESCE(dt.date_value, %s)
+            {fact_versions}
+            WHERE d.{key_col} IN (SELECT {key_col} FROM {stage})
+        ) AS seen
+        GROUP BY {key_col}
+    """, (UNKNOWN_DATE,))
+    last_seen = dict(cursor.fetchall())
+    late = observations[observations[key_col].map(last_seen).fillna('') >= observations['effective_from']]
+    if late.empty:
+        return 0, 0, 0
+    late_keys = f"{stage}_late_keys"
+    cursor.execute(f"DROP TABLE IF EXISTS {late_keys}")
+    cursor.execute(f"CREATE TEMPORARY TABLE {late_keys} ({key_col} TEXT)")
+    bulk_insert(cursor, late_keys, [key_col], [(key,) for key in late[key_col].unique()])
+
+    cursor.execute(f"""
+        SELECT {surrogate}, {', '.join(columns)}, effective_to, is_current
+        FROM {dimension}
+        WHERE {key_col} IN (SELECT {key_col} FROM {late_keys})
+    """)
+    existing = pd.DataFrame(cursor.fetchall(), columns=[surrogate] + columns + ['effective_to', 'is_current'])
+    existing['stored_from'] = existing['effective_from']
+    cursor.execute(f"""
+        SELECT DISTINCT d.{surrogate}, COALESCE(dt.date_value, %s)
+        {fact_versions}
+        WHERE d.{key_col} IN (SELECT {key_col} FROM {late_keys})
+    """, (UNKNOWN_DATE,))
+    seen = pd.DataFrame(cursor.fetchall(), columns=[surrogate, 'effective_from'])
+    seen = seen.merge(existing[[surrogate, key_col] + attr_cols], on=surrogate).drop(columns=surrogate)
+    new = observations[observations[key_col].isin(late[key_col])]
+
+    timeline = pd.concat([existing.assign(kind=EXISTING), seen.assign(kind=SEEN), new.assign(kind=NEW)],
+                         ignore_index=True)
+    timeline = timeline.sort_values([key_col, 'effective_from', 'kind'], kind='stable')
+
+    new_rows, updates, conflicts = [], [], 0
+    for _, versions in timeline.groupby(key_col, sort=False):
+        kept, key_conflicts = merge_timeline(versions.to_dict('records'), attr_cols)
+        conflicts += key_conflicts
+        for version, following in zip(kept, kept[1:] + [None]):
+            effective_to = following['effective_from'] if following else None
+            history = (version['effective_from'], effective_to, following is None)
+            if version['kind'] != EXISTING:
+                new_rows.append(tuple(version[col] for col in columns) + history[1:])
+            elif history != (version['stored_from'], None if pd.isna(version['effective_to']) else version['effective_to'],
+                             bool(version['is_current'])):
+                updates.append((int(version[surrogate]),) + history)
+    
+    if updates:
+        update_stage = f"{stage}_history"
+        cursor.execute(f"DROP TABLE IF EXISTS {update_stage}")
+        cursor.execute(f"""
+            CREATE TEMPORARY TABLE {update_stage} (
+                {surrogate} INTEGER, effective_from TEXT, effective_to TEXT, is_current BOOLEAN
+            )
+        """)
+        bulk_insert(cursor, update_stage, [surrogate, 'effective_from', 'effective_to', 'is_current'], updates)
+        assignments = ', '.join(f"""
+                {col} = (
+                    SELECT u.{col} FROM {update_stage} AS u
+                    WHERE u.{surrogate} = {dimension}.{surrogate}
+                )""" for col in ('effective_from', 'effective_to', 'is_current'))
+        cursor.execute(f"""
+            UPDATE {dimension}
+            SET {assignments}
+            WHERE {surrogate} IN (SELECT {surrogate} FROM {update_stage})
+        """)
+        cursor.execute(f"DROP TABLE IF EXISTS {update_stage}")
+    bulk_insert(cursor, dimension, columns + ['effective_to', 'is_current'], new_rows)
+
+    # Their rows are merged: the rest of merge_scd_dimension only sees the other keys
+    cursor.execute(f"DELETE FROM {stage} WHERE {key_col} IN (SELECT {key_col} FROM {late_keys})")
+    repointed = repoint_facts(cursor, dimension, late_keys) if new_rows or updates else 0
+    cursor.execute(f"DROP TABLE IF EXISTS {late_keys}")
+    return len(new_rows), conflicts, repointed
+
+
+def repoint_facts(cursor, dimension, keys_table):
+    """
+    Re-resolves, with resolve_scd_keys, the version referenced by every fact of the
+    natural keys in keys_table, whose history has changed, and updates the facts
+    that now fall in another version in one statement. Returns their number.
+    """
+    spec = SCD_DIMENSIONS[dimension]
+    key_col, key_src = spec['natural_key']
+    surrogate = spec['surrogate_key']
+    fact, fact_id, date_key = SCD_FACT['table'], SCD_FACT['id'], SCD_FACT['date_key']
+
+    cursor.execute(f"""
+        SELECT f.{fact_id}, f.{surrogate}, d.{key_col}, dt.date_value
+        FROM {fact} AS f
+        JOIN {dimension} AS d ON f.{surrogate} = d.{surrogate}
+        LEFT JOIN {SCD_FACT['date_dimension']} AS dt ON f.{date_key} = dt.{date_key}
+        WHERE d.{key_col} IN (SELECT {key_col} FROM {keys_table})
+    """)
+    facts = pd.DataFrame(cursor.fetchall(), columns=[fact_id, surrogate, key_src, 'date_value'])
+    if facts.empty:
+        return 0
+    facts['crash_datetime'] = pd.to_datetime(facts['date_value'], format=DATE_FORMAT)
+    facts['resolved'] = resolve_scd_keys(cursor, dimension, facts)
+    moved = facts[facts['resolved'] != facts[surrogate]]
+    if moved.empty:
+        return 0
+
+    fact_stage = f"stage_{fact.lower()}_{surrogate}"
+    cursor.execute(f"DROP TABLE IF EXISTS {fact_stage}")
+    cursor.execute(f"CREATE TEMPORARY TABLE {fact_stage} ({fact_id} INTEGER, {surrogate} INTEGER)")
+    bulk_insert(cursor, fact_stage, [fact_id, surrogate],
+                [(int(row_id), int(key)) for row_id, key in zip(moved[fact_id], moved['resolved'])])
+    cursor.execute(f"""
+        UPDATE {fact}
+        SET {surrogate} = (
+            SELECT m.{surrogate} FROM {fact_stage} AS m WHERE m.{fact_id} = {fact}.{fact_id}
+        )
+        WHERE {fact_id} IN (SELECT {fact_id} FROM {fact_stage})
+    """)
+    cursor.execute(f"DROP TABLE IF EXISTS {fact_stage}")
+    return len(moved)
+
+
+def merge_scd_dimension(cursor, dimension, df):
+    """
+    Merges the versions found in df into an SCD2 dimension with set-based statements:
+      1. bulk-load the versions into a staging table,
+      2. merge the keys that arrive late into their history and re-point their facts
+         (see merge_late_versions), and drop them from the staging table,
+      3. flag the first remaining version of a key as unchanged when it equals the
+         current row,
+      4. close the current row of every key that has a new version,
+      5. insert the new versions (the last one of each key is current).
+    Returns (new versions, versions inserted into the history of late keys,
+    conflicting late rows skipped, facts re-pointed).
+    """
+    spec = SCD_DIMENSIONS[dimension]
+    key_col = spec['natural_key'][0]
+    attr_cols = [col for col, _ in spec['attributes']]
+    stage = f"stage_{dimension.lower()}"
+    observations = build_observations(df, dimension)
+    versions = build_versions(df, dimension)
+    versions['unchanged'] = False
+    stage_cols = [key_col] + attr_cols + ['effective_from', 'effective_to', 'unchanged']
+
+    cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    cursor.execute(f"""
+        CREATE TEMPORARY TABLE {stage} AS
+        SELECT {key_col}, {', '.join(attr_cols)}, effective_from, effective_to,
+            FALSE AS unchanged
+        FROM {dimension}
+        WHERE 1 = 0
+    """)
+    bulk_insert(cursor, stage, stage_cols, list(versions[stage_cols].itertuples(index=False, name=None)))
+
+    # Keys seen again at or before their last known date: merged into their history
+    late, conflicts, repointed = merge_late_versions(cursor, dimension, stage, observations)
+
+    same_attributes = ' AND '.join(f"d.{col} = {stage}.{col}" for col in attr_cols)
+    cursor.execute(f"""
+        UPDATE {stage} SET unchanged = TRUE
+        WHERE effective_from = (
+            SELECT MIN(s.effective_from) FROM {stage} AS s WHERE s.{key_col} = {stage}.{key_col}
+        ) AND EXISTS (
+            SELECT 1 FROM {dimension} AS d
+            WHERE d.is_current AND d.{key_col} = {stage}.{key_col} AND {same_attributes}
+        )
+    """)
+
+    cursor.execute(f"""
+        UPDATE {dimension}
+        SET is_current = FALSE,
+            effective_to = (
+                SELECT MIN(s.effective_from) FROM {stage} AS s
+                WHERE s.{key_col} = {dimension}.{key_col} AND NOT s.unchanged
+            )
+        WHERE is_current AND {key_col} IN (
+            SELECT {key_col} FROM {stage} WHERE NOT unchanged
+        )
+    """)
+
+    cursor.execute(f"SELECT COUNT(*) FROM {stage} WHERE NOT unchanged")
+    inserted = cursor.fetchone()[0]
+    cursor.execute(f"""
+        INSERT INTO {dimension}({key_col}, {', '.join(attr_cols)}, effective_from, effective_to, is_current)
+        SELECT {key_col}, {', '.join(attr_cols)}, effective_from, effective_to, effective_to IS NULL
+        FROM {stage}
+        WHERE NOT unchanged
+        ORDER BY {key_col}, effective_from
+    """)
+    cursor.execute(f"DROP TABLE IF EXISTS {stage}")
+    return inserted, late, conflicts, repointed
+
+
+def resolve_scd_keys(cursor, dimension, df):
+    """
+    Returns the surrogate key of the version in force at each row's crash date,
+    aligned with df's index. Rows dated before the first known version of their key
+    (late-arriving data) get that first version.
+    """
+    spec = SCD_DIMENSIONS[dimension]
+    key_col, key_src = spec['natural_key']
+    surrogate = spec['surrogate_key']
+
+    cursor.execute(f"SELECT {key_col}, {surrogate}, effective_from FROM {dimension}")
+    dim = pd.DataFrame(cursor.fetchall(), columns=[key_col, surrogate, 'effective_from'])
+    dim[key_col] = dim[key_col].astype(str)
+    dim['effective_from'] = pd.to_datetime(dim['effective_from'], format=DATE_FORMAT)
+    dim = dim.sort_values('effective_from', kind='stable')
+
+    rows = pd.DataFrame({
+        key_col: df[key_src].astype(str),
+        'effective_from': df['crash_datetime'].fillna(pd.Timestamp(UNKNOWN_DATE)).astype(dim['effective_from'].dtype),
+        'row_index': df.index,
+    }).sort_values('effective_from', kind='stable')
+
+    keys = pd.merge_asof(rows, dim, on='effective_from', by=key_col, direction='backward')
+    missing = keys[surrogate].isna()
+    if missing.any():
+        earliest = dim.drop_duplicates(key_col).set_index(key_col)[surrogate]
+        keys.loc[missing, surrogate] = keys.loc[missing, key_col].map(earliest)
+    return keys.set_index('row_index')[surrogate].astype('Int64').reindex(df.index)
@@ -0,0 +1,172 @@
+from functools import reduce
+
+import numpy as np
+import pandas as pd
+
+# Geohash resolutions stored on DimLocation_Crash / DimLocation_Veh
+# (one geohash_<precision> column each):
+#   5 -> ~4.9km x 4.9km, 6 -> ~1.2km x 0.6km, 7 -> ~153m x 153m
+GEOHASH_PRECISIONS = (5, 6, 7)
+
+BASE32 = np.array(list("0123456789bcdefghjkmnpqrstuvwxyz"))
+EARTH_RADIUS_KM = 6371.0088
+
+
+def geohash_encode(latitude, longitude, precision):
+    """
+    Encodes arrays of coordinates as geohash strings in one vectorized pass.
+    Missing coordinates (NaN, or the 0 placeholder left by the cleaners) become None.
+    """
+    lat = np.asarray(latitude, dtype=float)
+    lon = np.asarray(longitude, dtype=float)
+    valid = np.isfinite(lat) & np.isfinite(lon) & (lat != 0) & (lon != 0)
+
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+
+    # Position of each coordinate inside the 2^bits grid of its axis
+    lat_idx = np.clip(np.floor((np.where(valid, lat, 0) + 90.0) / 180.0 * (1 << lat_bits)),
+                      0, (1 << lat_bits) - 1).astype(np.int64)
+    lon_idx = np.clip(np.floor((np.where(valid, lon, 0) + 180.0) / 360.0 * (1 << lon_bits)),
+                      0, (1 << lon_bits) - 1).astype(np.int64)
+
+    # Interleave the bits, starting with longitude
+    code = np.zeros(lat.shape, dtype=np.int64)
+    for i in range(total_bits):
+        if i % 2 == 0:
+            bit = (lon_idx >> (lon_bits - 1 - i // 2)) & 1
+        else:
+            bit = (lat_idx >> (lat_bits - 1 - i // 2)) & 1
+        code = (code << 1) | bit
+
+    chars = [BASE32[(code >> (5 * (precision - 1 - c))) & 31] for c in range(precision)]
+    hashes = reduce(np.char.add, chars).astype(object)
+    hashes[~valid] = None
+    return hashes
+
+
+def geohash_cell_size(precision):
+    """Returns the (height, width) in degrees of a geohash cell"""
+    total_bits = 5 * precision
+    return 180.0 / (1 << (total_bits // 2)), 360.0 / (1 << ((total_bits + 1) // 2))
+
+
+def add_geohash_columns(frame, lat_col="Latitude", lon_col="Longitude"):
+    """Adds a geohash_<precision> column to frame for every GEOHASH_PRECISIONS entry"""
+    for precision in GEOHASH_PRECISIONS:
+        frame[f"geohash_{precision}"] = geohash_encode(frame[lat_col], frame[lon_col], precision)
+    return frame
+
+
+def geohash_values(row):
+    """Returns the geohash columns of a row as a tuple, with None for missing cells"""
+    return tuple(None if pd.isna(row[f"geohash_{precision}"]) else row[f"geohash_{precision}"]
+                 for precision in GEOHASH_PRECISIONS)
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    """Great-circle distance in km, vectorized over numpy arrays"""
+    lat1, lon1, lat2, lon2 = map(np.radians, (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(a))
+
+
+def geohash_cells_within(latitude, longitude, radius_km):
+    """
+    Returns (precision, cells): the geohash cells that cover a circle of radius_km
+    around a point, using the finest stored precision whose cells are at least
+    as large as the radius (so at most a 3x3 block of cells is needed).
+    """
+    precision = GEOHASH_PRECISIONS[0]
+    for candidate in GEOHASH_PRECISIONS:
+        height, width = geohash_cell_size(candidate)
+        if min(height * 111.32, width * 111.32 * np.cos(np.radians(latitude))) >= radius_km:
+            precision = candidate
+
+    height, width = geohash_cell_size(precision)
+    dlat = radius_km / 111.32
+    dlon = radius_km / (111.32 * max(np.cos(np.radians(latitude)), 1e-6))
+    lats = np.arange(latitude - dlat, latitude + dlat + height, height)
+    lons = np.arange(longitude - dlon, longitude + dlon + width, width)
+    grid_lat, grid_lon = np.meshgrid(np.clip(lats, -90, 90), np.clip(lons, -180, 180))
+    cells = geohash_encode(grid_lat.ravel(), grid_lon.ravel(), precision)
+    return precision, sorted(set(cell for cell in cells if cell is not None))
+
+
+# --------------------------------------------------------------------
+# Agregados por celda y consultas espaciales sobre el CrashDW
+# --------------------------------------------------------------------
+def create_spatial_tables(cursor):
+    """Creates the pre-aggregated crash counts per geohash cell"""
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS AggCrashGeohash (
+        precision INTEGER,
+        geohash TEXT,
+        crash_count INTEGER,
+        num_injuries INTEGER,
+        num_fatalities INTEGER,
+        PRIMARY KEY (precision, geohash)
+    )
+    """)
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_aggcrashgeohash_count
+        ON AggCrashGeohash(precision, crash_count)
+    """)
+
+
+def build_crash_cell_aggregates(cursor):
+    """
+    Rebuilds AggCrashGeohash from FactCrash, one GROUP BY per stored precision.
+    """
+    cursor.execute("DELETE FROM AggCrashGeohash")
+    for precision in GEOHASH_PRECISIONS:
+        column = f"geohash_{precision}"
+        cursor.execute(f"""
+            INSERT INTO AggCrashGeohash(precision, geohash, crash_count, num_injuries, num_fatalities)
+            SELECT %s, l.{column}, COUNT(*), SUM(f.num_injuries), SUM(f.num_fatalities)
+            FROM FactCrash AS f
+            JOIN DimLocation_Crash AS l
+                ON f.location_key_crash = l.location_key_crash
+            WHERE l.{column} IS NOT NULL
+            GROUP BY l.{column}
+        """, (precision,))
+
+
+def crash_hotspots(cursor, precision=6, limit=10):
+    """Returns the geohash cells with the most crashes at the given precision"""
+    cursor.execute("""
+        SELECT geohash, crash_count, num_injuries, num_fatalities
+        FROM AggCrashGeohash
+        WHERE precision = %s
+        ORDER BY crash_count DESC
+        LIMIT %s
+    """, (precision, limit))
+    return pd.DataFrame(cursor.fetchall(),
+                        columns=["geohash", "crash_count", "num_injuries", "num_fatalities"])
+
+
+def crashes_near(cursor, latitude, longitude, radius_km):
+    """
+    Returns the crashes within radius_km of a point. Candidates are fetched through
+    the indexed geohash columns and then filtered by exact distance.
+    """
+    precision, cells = geohash_cells_within(latitude, longitude, radius_km)
+    column = f"geohash_{precision}"
+    placeholders = ", ".join(["%s"] * len(cells))
+    cursor.execute(f"""
+        SELECT f.report_number, l.latitude, l.longitude, f.num_injuries, f.num_fatalities
+        FROM DimLocation_Crash AS l
+        JOIN FactCrash AS f
+            ON f.location_key_crash = l.location_key_crash
+        WHERE l.{column} IN ({placeholders})
+    """, cells)
+    candidates = pd.DataFrame(cursor.fetchall(), columns=[
+        "report_number", "latitude", "longitude", "num_injuries", "num_fatalities"
+    ])
+    candidates["distance_km"] = haversine_km(
+        latitude, longitude, candidates["latitude"].to_numpy(dtype=float),
+        candidates["longitude"].to_numpy(dtype=float)
+    )
+    return candidates[candidates["distance_km"] <= radius_km].sort_values("distance_km")
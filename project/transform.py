@@ -0,0 +1,193 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from spatial import add_geohash_columns
+
+try:
+    import pyarrow as pa
+    PYARROW_AVAILABLE = True
+except ImportError:
+    PYARROW_AVAILABLE = False
+
+# Parallel transform configuration
+# Frames smaller than TRANSFORM_PARALLEL_MIN_ROWS are transformed in-process,
+# where starting the worker pool would cost more than it saves.
+TRANSFORM_WORKERS = os.cpu_count() or 1
+TRANSFORM_PARALLEL_MIN_ROWS = 100000
+
+# Crash-level columns copied from the first row of each report into FactCrash
+CRASH_COLUMNS = [
+    "Crash Date/Time", "crash_datetime",
+    "Route Type", "Road Name", "Cross-Street Name", "Off-Road Description", "Municipality",
+    "Latitude", "Longitude", "geohash_5", "geohash_6", "geohash_7",
+    "Weather", "Surface Condition", "Light", "Traffic Control",
+    "ACRS Report Type", "Collision Type", "Related Non-Motorist", "Agency Name"
+]
+
+BOOLEAN_COLUMNS = ['Driverless Vehicle', 'Parked Vehicle']
+
+# Low-cardinality attributes of each vehicle involvement, packed into the junk
+# dimension DimJunk_Veh instead of being repeated as text on every fact row
+JUNK_COLUMNS = {
+    'injury_severity': 'Injury Severity',
+    'driver_at_fault': 'Driver At Fault',
+    'circumstance': 'Circumstance',
+}
+TRUE_VALUES = ['Y', 'YES', 'TRUE', '1']
+DATE_FORMAT = "%m/%d/%Y %I:%M:%S %p"
+
+
+# --------------------------------------------------------------------
+# Limpieza vectorizada
+# --------------------------------------------------------------------
+def clean_dataframe(df):
+    """
+    Applies the cleaning rules to a whole DataFrame, column by column:
+    float columns get 0 for missing values, every other column becomes a stripped
+    string ('' for missing), Vehicle Year is range checked, the boolean columns are
+    normalized to Y/N, and crash_datetime plus the geohash columns are derived.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype in ['int64', 'float64']:
+            df[col] = df[col].fillna(0)
+        else:
+            df[col] = df[col].astype('string').fillna('').str.strip().astype(object)
+
+    # Handle special cases for Vehicle Year
+    year = pd.to_numeric(df['Vehicle Year'], errors='coerce').fillna(0)
+    year = np.trunc(year).astype(int)
+    df['Vehicle Year'] = year.where((year >= 1900) & (year <= datetime.now().year), 0)
+
+    # Normalize boolean fields
+    for bool_col in BOOLEAN_COLUMNS:
+        is_true = df[bool_col].str.upper().isin(TRUE_VALUES)
+        df[bool_col] = np.where(is_true, 'Y', 'N')
+
+    # Parse the crash date once; invalid or missing dates become NaT
+    df['crash_datetime'] = pd.to_datetime(df['Crash Date/Time'], format=DATE_FORMAT, errors='coerce')
+
+    # Derive geohash cells (geohash_5, geohash_6, geohash_7) from the coordinates
+    add_geohash_columns(df)
+    return df
+
+
+def junk_combinations(df):
+    """
+    Returns the distinct combinations of the junk attributes in a cleaned frame,
+    one row per DimJunk_Veh member, with the dimension's column names.
+    """
+    combos = df[list(JUNK_COLUMNS.values())].drop_duplicates()
+    return combos.set_axis(list(JUNK_COLUMNS), axis=1).reset_index(drop=True)
+
+
+# --------------------------------------------------------------------
+# Resumen de FactCrash por "Report Number"
+#    num_vehicles_involved = COUNT(distinct Vehicle ID)
+#    num_injuries = COUNT(rows donde "Injury Severity" != "NO APPARENT INJURY")
+#    num_fatalities = COUNT(rows donde "Injury Severity" contiene "FATAL")
+#
+#    Cada partición produce un resumen parcial que se combina después,
+#    porque un mismo reporte puede quedar repartido entre particiones.
+# --------------------------------------------------------------------
+def partial_crash_summary(df):
+    """
+    Pre-aggregates a cleaned partition by Report Number.
+    Returns (partial, vehicles): per-report crash attributes taken from the first row
+    (with its global row position), injury and fatality counts, and the distinct
+    (Report Number, Vehicle ID) pairs needed to count vehicles after merging.
+    """
+    severity = df["Injury Severity"].str.strip().str.upper()
+    rows = df[["Report Number"] + CRASH_COLUMNS].assign(
+        row_position=df.index.to_numpy(),
+        # Consideramos lesión toda que no sea "NO APPARENT INJURY"
+        num_injuries=(severity != "NO APPARENT INJURY").astype(int),
+        num_fatalities=severity.str.contains("FATAL", regex=False).astype(int),
+    )
+    first_rows = rows.drop_duplicates("Report Number", keep="first").set_index("Report Number")
+    partial = first_rows[["row_position"] + CRASH_COLUMNS].copy()
+    counts = rows.groupby("Report Number")[["num_injuries", "num_fatalities"]].sum()
+    partial[["num_injuries", "num_fatalities"]] = counts
+
+    vehicles = df[["Report Number", "Vehicle ID"]].drop_duplicates()
+    return partial.reset_index(), vehicles
+
+def merge_crash_summaries(partials):
+    """
+    Merges the partial summaries of every partition into the FactCrash frame,
+    one row per Report Number, ordered by Report Number.
+    """
+    partial = pd.concat([p for p, _ in partials], ignore_index=True)
+    vehicles = pd.concat([v for _, v in partials], ignore_index=True).drop_duplicates()
+
+    # The crash attributes come from the first row of the report in the file
+    first_rows = partial.sort_values("row_position", kind="stable").drop_duplicates("Report Number")
+    summary = first_rows.set_index("Report Number")[CRASH_COLUMNS].sort_index()
+    summary["num_vehicles_involved"] = vehicles.groupby("Report Number").size()
+    counts = partial.groupby("Report Number")[["num_injuries", "num_fatalities"]].sum()
+    summary[["num_injuries", "num_fatalities"]] = counts
+    return summary.reset_index().rename(columns={"Report Number": "report_number"})
+
+
+# --------------------------------------------------------------------
+# Transformación paralela por particiones de filas
+#    Las particiones viajan a los procesos como Arrow IPC (si pyarrow
+#    está instalado) en lugar de DataFrames serializados con pickle.
+# --------------------------------------------------------------------
+def to_ipc(df):
+    """Serializes a DataFrame to an Arrow IPC stream (or returns it unchanged without pyarrow)"""
+    if not PYARROW_AVAILABLE:
+        return df
+    table = pa.Table.from_pandas(df, preserve_index=True)
+    sink = pa.BufferOutputStream()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+def from_ipc(payload):
+    """
+    Inverse of to_ipc. Arrow reads text back as the str dtype, so the columns that
+    were object columns in the serialized frame are made object columns again.
+    """
+    if not PYARROW_AVAILABLE:
+        return payload
+    table = pa.ipc.open_stream(payload).read_all()
+    df = table.to_pandas()
+    object_columns = [column['name'] for column in table.schema.pandas_metadata['columns']
+                      if column['numpy_type'] == 'object' and column['name'] in df.columns]
+    return df.astype({column: object for column in object_columns})
+
+def transform_partition(payload):
+    """
+    Worker entry point: cleans one partition and pre-aggregates it for FactCrash.
+    """
+    partition = clean_dataframe(from_ipc(payload))
+    partial, vehicles = partial_crash_summary(partition)
+    return to_ipc(partition), to_ipc(partial), to_ipc(vehicles)
+
+def transform_crash_data(df, workers=None):
+    """
+    Cleans the raw CSV frame and builds the FactCrash summary.
+    Returns (clean_df, fact_crash_df). Large frames are split into one row-range
+    partition per worker and transformed in a process pool.
+    """
+    workers = workers or TRANSFORM_WORKERS
+    if workers <= 1 or len(df) < TRANSFORM_PARALLEL_MIN_ROWS:
+        clean_df = clean_dataframe(df)
+        return clean_df, merge_crash_summaries([partial_crash_summary(clean_df)])
+
+    bounds = np.linspace(0, len(df), workers + 1, dtype=int)
+    payloads = [to_ipc(df.iloc[start:end]) for start, end in zip(bounds[:-1], bounds[1:])]
+
+    partitions, partials = [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for partition, partial, vehicles in executor.map(transform_partition, payloads):
+            partitions.append(from_ipc(partition))
+            partials.append((from_ipc(partial), from_ipc(vehicles)))
+
+    clean_df = pd.concat(partitions)
+    return clean_df, merge_crash_summaries(partials)
@@ -0,0 +1,116 @@
+import csv
+import os
+import random
+import sys
+
+import pytest
+
+# The ETL modules import each other as top-level modules from project/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'project'))
+
+
+def crash_record(number, rng):
+    """One row of a drivers report with every column of ingest.dtypes"""
+    from ingest import dtypes
+    record = {col: '' for col in dtypes}
+    record.update({
+        'Report Number': f"R{number // 2:05d}",
+        'Local Case Number': str(number),
+        'Person ID': f"P{rng.randint(0, 40)}",
+        'Vehicle ID': f"V{rng.randint(0, 60)}",
+        'Agency Name': rng.choice(['Montgomery County Police', 'Rockville Police']),
+        'ACRS Report Type': rng.choice(['Injury Crash', 'Property Damage Crash']),
+        'Route Type': rng.choice(['County', 'State', '']),
+        'Road Name': rng.choice(['GEORGIA AVE', 'ROCKVILLE PIKE', 'N/A']),
+        'Cross-Street Name': 'MAIN ST',
+        'Municipality': rng.choice(['GAITHERSBURG', 'ROCKVILLE', 'N/A']),
+        'Crash Date/Time': f"{rng.randint(1, 12):02d}/{rng.randint(1, 28):02d}/20{rng.randint(15, 23)} "
+                           f"{rng.randint(1, 12):02d}:00:00 {rng.choice(['AM', 'PM'])}",
+        'Collision Type': rng.choice(['HEAD ON', 'SAME DIR REAR END', 'OTHER']),
+        'Weather': rng.choice(['CLEAR', 'RAINING', 'UNKNOWN']),
+        'Surface Condition': 'DRY',
+        'Light': 'DAYLIGHT',
+        'Traffic Control': 'NO CONTROLS',
+        'Driver Substance Abuse': 'NONE DETECTED',
+        'Driver At Fault': rng.choice(['Yes', 'No', 'Unknown']),
+        'Injury Severity': rng.choice(['NO APPARENT INJURY', 'POSSIBLE INJURY', 'FATAL INJURY']),
+        'Circumstance': rng.choice(['', 'N/A', 'WET']),
+        'Driver Distracted By': 'NOT DISTRACTED',
+        'Drivers License State': 'MD',
+        'Vehicle Damage Extent': rng.choice(['MINOR', 'SEVERE']),
+        'Vehicle First Impact Location': 'ONE OCLOCK',
+        'Vehicle Body Type': 'PASSENGER CAR',
+        'Vehicle Movement': 'MOVING CONSTANT SPEED',
+        'Vehicle Going Dir': 'North',
+        'Speed Limit': rng.choice(['35', '0', '25', '']),
+        'Vehicle Year': rng.choice(['2015', '0000', '1800', '2010']),
+        'Vehicle Make': ' TOYOTA ',
+        'Vehicle Model': 'CAMRY',
+        'Driverless Vehicle': rng.choice(['No', 'Yes', 'Unknown']),
+        'Parked Vehicle': 'No',
+        'Latitude': f"{39 + rng.random() / 10:.6f}",
+        'Longitude': f"{-77 - rng.random() / 10:.6f}",
+    })
+    return record
+
+
+@pytest.fixture
+def write_crash_csv():
+    """Returns a function that writes a synthetic drivers report with n rows to path"""
+    def write(path, n=200, seed=1, first=0):
+        from ingest import dtypes
+        rng = random.Random(seed)
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(dtypes))
+            writer.writeheader()
+            for number in range(first, first + n):
+                writer.writerow(crash_record(number, rng))
+        return path
+    return write
+
+
+@pytest.fixture
+def warehouse(tmp_path, monkeypatch):
+    """
+    Points the ETL at SQLite databases in a temporary directory (DQ reports included)
+    and loads the files in-process.
+    """
+    import backends
+    import dataWarehouse
+    monkeypatch.setattr(backends, 'DW_BACKEND', 'sqlite')
+    monkeypatch.setattr(backends, 'DW_DATA_DIR', str(tmp_path / 'warehouse'))
+    monkeypatch.setattr(dataWarehouse, 'INGEST_WORKERS', 1)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
+
+
+@pytest.fixture
+def fail_after():
+    """Returns a function that makes insert_fact_vehicle raise after inserting rows fact rows"""
+    def patch(monkeypatch, rows):
+        import dataWarehouse
+        insert = dataWarehouse.insert_fact_vehicle
+        inserted = []
+
+        def failing(row, cursor):
+            if len(inserted) == rows:
+                raise RuntimeError("killed")
+            insert(row, cursor)
+            inserted.append(row)
+        monkeypatch.setattr(dataWarehouse, 'insert_fact_vehicle', failing)
+    return patch
+
+
+@pytest.fixture
+def query():
+    """Returns a function that runs one query on a warehouse database and returns its rows"""
+    def run(dbname, sql, params=None):
+        from backends import connect
+        conn = connect(dbname, create=False)
+        try:
+            cursor = conn.cursor()
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+        finally:
+            conn.close()
+    return run
@@ -0,0 +1,77 @@
+import numpy as np
+import pytest
+
+import backends
+from backends import bulk_insert, connect, list_columns, list_tables, translate_sql
+
+LOCAL_BACKENDS = ['sqlite', pytest.param('duckdb', marks=pytest.mark.skipif(
+    backends.duckdb is None, reason="duckdb is not installed"))]
+
+CREATE_DIMENSION = """
+    CREATE TABLE IF NOT EXISTS DimTest (
+        test_key SERIAL PRIMARY KEY,
+        name TEXT,
+        score DOUBLE PRECISION
+    )
+"""
+
+
+def test_translate_serial_for_sqlite():
+    setup, sql = translate_sql(CREATE_DIMENSION, 'sqlite')
+    assert setup == []
+    assert 'test_key INTEGER PRIMARY KEY AUTOINCREMENT' in sql
+
+
+def test_translate_serial_for_duckdb():
+    setup, sql = translate_sql(CREATE_DIMENSION, 'duckdb')
+    assert setup == ["CREATE SEQUENCE IF NOT EXISTS dimtest_test_key_seq"]
+    assert "test_key INTEGER PRIMARY KEY DEFAULT nextval('dimtest_test_key_seq')" in sql
+
+
+@pytest.mark.parametrize('backend, named', [('sqlite', ':name'), ('duckdb', '$name')])
+def test_translate_placeholders(backend, named):
+    _, sql = translate_sql("SELECT * FROM t WHERE a = %s AND b LIKE 'x%%' AND c = %(name)s", backend)
+    assert sql == f"SELECT * FROM t WHERE a = ? AND b LIKE 'x%' AND c = {named}"
+
+
+@pytest.fixture
+def local_db(tmp_path, monkeypatch, request):
+    monkeypatch.setattr(backends, 'DW_DATA_DIR', str(tmp_path))
+    conn = connect('testDW', backend=request.param)
+    yield conn
+    conn.close()
+
+
+@pytest.mark.parametrize('local_db', LOCAL_BACKENDS, indirect=True)
+def test_connect_creates_the_database_file(local_db, tmp_path):
+    assert (tmp_path / f"testDW.{local_db.backend}").exists()
+    assert list_tables(local_db) == []
+
+
+def test_connect_without_create_requires_the_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(backends, 'DW_DATA_DIR', str(tmp_path))
+    with pytest.raises(FileNotFoundError):
+        connect('missingDW', backend='sqlite', create=False)
+    with pytest.raises(ValueError):
+        connect('testDW', backend='oracle')
+
+
+@pytest.mark.parametrize('local_db', LOCAL_BACKENDS, indirect=True)
+def test_bulk_insert_and_transactions(local_db):
+    cursor = local_db.cursor()
+    cursor.execute(CREATE_DIMENSION)
+    local_db.commit()
+    assert [table.lower() for table in list_tables(local_db)] == ['dimtest']
+    assert list_columns(local_db, 'DimTest') == ['test_key', 'name', 'score']
+
+    # numpy scalars are bound as Python values; an empty batch is a no-op
+    bulk_insert(cursor, 'DimTest', ['name', 'score'], [('a', np.float64(1.5)), ('b', None)])
+    bulk_insert(cursor, 'DimTest', ['name', 'score'], [])
+    local_db.commit()
+
+    cursor.execute("INSERT INTO DimTest(name, score) VALUES (%s, %s) RETURNING test_key", ('c', np.int64(3)))
+    assert cursor.fetchone() == (3,)
+    local_db.rollback()
+
+    cursor.execute("SELECT test_key, name, score FROM DimTest ORDER BY test_key")
+    assert cursor.fetchall() == [(1, 'a', 1.5), (2, 'b', None)]
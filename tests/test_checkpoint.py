@@ -0,0 +1,83 @@
+import os
+
+import pytest
+
+import backends
+import dataWarehouse
+
+COUNTS = {
+    'crashDW': ["FactCrash", "DimLocation_Crash", "DimCondition_Crash", "DimCrashType"],
+    'vehicleDW': ["FactVehicleInvolment", "DimLocation_Veh", "DimDriver", "DimVehicle", "DimJunk_Veh"],
+}
+
+
+def table_counts(query):
+    return {table: query(dbname, f"SELECT COUNT(*) FROM {table}")[0][0]
+            for dbname, tables in COUNTS.items() for table in tables}
+
+
+@pytest.fixture
+def expected_counts(warehouse, write_crash_csv, query, monkeypatch):
+    """Table counts after loading crashes.csv once, without interruptions, in another directory"""
+    with monkeypatch.context() as patch:
+        patch.setattr(backends, 'DW_DATA_DIR', str(warehouse / 'reference'))
+        dataWarehouse.main([str(write_crash_csv(warehouse / 'crashes.csv'))])
+        return table_counts(query)
+
+
+def test_resume_after_failure(warehouse, write_crash_csv, query, expected_counts, fail_after, monkeypatch):
+    path = str(write_crash_csv(warehouse / 'crashes.csv'))
+    monkeypatch.setattr(dataWarehouse, 'CHECKPOINT_BATCH_SIZE', 50)
+
+    with monkeypatch.context() as patch:
+        fail_after(patch, 120)
+        with pytest.raises(RuntimeError, match="killed"):
+            dataWarehouse.main([path])
+
+    # The first two batches of the vehicle facts are committed, the third one is not
+    assert query('vehicleDW', "SELECT COUNT(*) FROM FactVehicleInvolment")[0][0] == 100
+    assert query('vehicleDW', """
+        SELECT last_offset, status FROM etl_checkpoint WHERE stage = 'fact_vehicle'
+    """) == [(100, 'running')]
+
+    dataWarehouse.main([path])
+    assert table_counts(query) == expected_counts
+    assert query('vehicleDW', "SELECT status FROM etl_checkpoint WHERE stage = 'fact_vehicle'") == [('done',)]
+
+
+def test_same_file_through_another_path_is_not_loaded_again(warehouse, write_crash_csv, query):
+    os.makedirs(warehouse / 'data')
+    write_crash_csv(warehouse / 'data' / 'crashes.csv')
+    dataWarehouse.main(['data/'])
+    counts = table_counts(query)
+
+    dataWarehouse.main(['./data/crashes.csv'])
+    assert table_counts(query) == counts
+
+
+def test_changed_file_is_refused(warehouse, write_crash_csv, query):
+    path = warehouse / 'crashes.csv'
+    write_crash_csv(path)
+    dataWarehouse.main([str(path)])
+    counts = table_counts(query)
+
+    # Re-exported under the same name with other rows
+    write_crash_csv(path, seed=2)
+    with pytest.raises(RuntimeError, match="changed since stage fact_crash was completed"):
+        dataWarehouse.main([str(path)])
+    assert table_counts(query) == counts
+
+
+def test_changed_file_is_not_resumed(warehouse, write_crash_csv, query, fail_after, monkeypatch):
+    path = warehouse / 'crashes.csv'
+    write_crash_csv(path)
+    monkeypatch.setattr(dataWarehouse, 'CHECKPOINT_BATCH_SIZE', 50)
+    with monkeypatch.context() as patch:
+        fail_after(patch, 120)
+        with pytest.raises(RuntimeError, match="killed"):
+            dataWarehouse.main([str(path)])
+
+    write_crash_csv(path, n=250)
+    with pytest.raises(RuntimeError, match="changed since stage fact_crash"):
+        dataWarehouse.main([str(path)])
+    assert query('vehicleDW', "SELECT COUNT(*) FROM FactVehicleInvolment")[0][0] == 100
@@ -0,0 +1,75 @@
+import pandas as pd
+import pytest
+
+import backends
+import dataWarehouse
+from backends import connect
+from cube import CUBE_DIMENSIONS, CUBE_GROUPING_SETS, CUBE_MEASURES, cube_query
+
+BACKENDS = ['sqlite', pytest.param('duckdb', marks=pytest.mark.skipif(
+    backends.duckdb is None, reason="duckdb is not installed"))]
+
+FACT_MEASURES = 'COUNT(*), SUM(fc.num_injuries), SUM(fc.num_fatalities), SUM(fc.num_vehicles_involved)'
+FACT_SOURCE = """
+    FROM FactCrash AS fc
+    LEFT JOIN DimDateTime_Crash AS dt ON fc.date_key_crash = dt.date_key_crash
+    LEFT JOIN DimCondition_Crash AS c ON fc.condition_key_crash = c.condition_key_crash
+    LEFT JOIN DimCrashType AS ct ON fc.crash_type_key = ct.crash_type_key
+    LEFT JOIN DimLocation_Crash AS l ON fc.location_key_crash = l.location_key_crash
+"""
+
+
+@pytest.fixture(params=BACKENDS)
+def crash_conn(request, warehouse, write_crash_csv, monkeypatch):
+    monkeypatch.setattr(backends, 'DW_BACKEND', request.param)
+    dataWarehouse.main([str(write_crash_csv(warehouse / 'crashes.csv', n=400))])
+    conn = connect('crashDW', create=False)
+    yield conn
+    conn.close()
+
+
+def fact_query(cursor, dimensions, filters):
+    """The same roll-up computed directly on FactCrash"""
+    select = ''.join(f"{CUBE_DIMENSIONS[name]}, " for name in dimensions)
+    where = ' AND '.join(f"{CUBE_DIMENSIONS[name]} = %s" for name in filters)
+    group_by = ', '.join(CUBE_DIMENSIONS[name] for name in dimensions)
+    cursor.execute(f"""
+        SELECT {select}{FACT_MEASURES}
+        {FACT_SOURCE}
+        {f'WHERE {where}' if where else ''}
+        {f'GROUP BY {group_by} ORDER BY {group_by}' if dimensions else ''}
+    """, list(filters.values()))
+    return pd.DataFrame(cursor.fetchall(), columns=list(dimensions) + CUBE_MEASURES)
+
+
+ROLL_UPS = [
+    ([], {}),
+    (['year'], {}),
+    (['weather', 'collision_type'], {}),
+    (['year', 'month'], {'weather': 'RAINING'}),
+    (['municipality', 'route_type', 'day_of_week'], {}),
+    (['year', 'month', 'weather', 'collision_type'], {}),
+    (['route_type'], {'year': 2020, 'collision_type': 'HEAD ON', 'weather': 'CLEAR'}),
+]
+
+
+def test_cube_matches_fact_table(crash_conn):
+    cursor = crash_conn.cursor()
+    for dimensions, filters in ROLL_UPS:
+        result = cube_query(cursor, dimensions, filters)
+        expected = fact_query(cursor, dimensions, filters)
+        if filters:
+            # A filter with no matching fact gives a row of NULL sums on both sides
+            expected = expected[expected['crash_count'] > 0]
+            result = result[result['crash_count'] > 0]
+
+        assert len(expected) > 0
+        pd.testing.assert_frame_equal(result[CUBE_MEASURES].astype(int).reset_index(drop=True),
+                                      expected[CUBE_MEASURES].astype(int).reset_index(drop=True))
+        for name in dimensions:
+            assert list(result[name]) == list(expected[name])
+
+
+def test_three_attributes_are_materialized():
+    for dims in [('year', 'month', 'weather'), ('municipality', 'route_type', 'collision_type')]:
+        assert set(min((s for s in CUBE_GROUPING_SETS if set(dims) <= set(s)), key=len)) == set(dims)
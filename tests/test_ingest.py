@@ -0,0 +1,88 @@
+import pandas as pd
+import pytest
+
+from ingest import (PYARROW_AVAILABLE, SCHEMA_INCIDENTS, USED_COLUMNS, detect_schema,
+                    read_crash_csv, read_staging_csv)
+
+ENGINES = ['c', pytest.param('pyarrow', marks=pytest.mark.skipif(
+    not PYARROW_AVAILABLE, reason="pyarrow is not installed"))]
+
+
+def csv_line(values):
+    """Builds a CSV line with every USED_COLUMNS field, overriding some of them"""
+    row = {col: f"{col} value" for col in USED_COLUMNS}
+    row.update({'Speed Limit': '35', 'Vehicle Year': '2015', 'Latitude': '39.1', 'Longitude': '-77.2'})
+    row.update(values)
+    return ','.join(row[col] for col in USED_COLUMNS)
+
+
+@pytest.fixture
+def crash_csv(tmp_path):
+    width = len(USED_COLUMNS)
+    lines = [
+        ','.join(USED_COLUMNS),
+        csv_line({'Report Number': 'R1', 'Weather': 'N/A', 'Light': 'UNKNOWN',
+                  'Traffic Control': 'NOT REPORTED', 'Route Type': ''}),
+        csv_line({'Report Number': 'R2', 'Speed Limit': '', 'Vehicle Year': '0000',
+                  'Vehicle Make': '  TOYOTA ', 'Road Name': '"MAIN ST, N"'}),
+        # Short and long lines
+        ','.join(['R3'] * (width - 3)),
+        ','.join(['R4'] * (width + 2)),
+        '',
+        csv_line({'Report Number': 'R5', 'Municipality': '"GAITHERS\nBURG"'}),
+    ]
+    path = tmp_path / "crashes.csv"
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return path
+
+
+@pytest.mark.parametrize('engine', ENGINES)
+def test_read_crash_csv(crash_csv, engine):
+    df = read_crash_csv(crash_csv, engine=engine)
+
+    assert list(df.columns) == USED_COLUMNS
+    assert list(df['Report Number']) == ['R1', 'R2', 'R5']
+    assert df.attrs['bad_lines'] == 2
+
+    # na_values tokens, with keep_default_na off
+    first = df.iloc[0]
+    assert first[['Weather', 'Light', 'Traffic Control', 'Route Type']].isna().all()
+    assert df['Vehicle Make'].iloc[1] == '  TOYOTA '
+    assert df['Road Name'].iloc[1] == 'MAIN ST, N'
+    assert df['Municipality'].iloc[2] == 'GAITHERS\nBURG'
+
+    # Nullable integers
+    assert str(df['Speed Limit'].dtype) == 'Int64'
+    assert str(df['Vehicle Year'].dtype) == 'Int64'
+    assert df['Speed Limit'].iloc[0] == 35
+    assert df['Speed Limit'].isna().iloc[1]
+    assert df['Vehicle Year'].isna().iloc[1]
+
+
+@pytest.mark.skipif(not PYARROW_AVAILABLE, reason="pyarrow is not installed")
+def test_engines_agree(crash_csv):
+    expected = read_crash_csv(crash_csv, engine='c')
+    result = read_crash_csv(crash_csv, engine='pyarrow')
+    pd.testing.assert_frame_equal(result, expected)
+    assert result.attrs['bad_lines'] == expected.attrs['bad_lines']
+
+
+def test_read_staging_csv(tmp_path):
+    path = tmp_path / "incidents.csv"
+    path.write_text(
+        "Report Number,Hit/Run,Mile Point,Number of Lanes\n"
+        "R1,No,1.50,2\n"
+        "R2,Yes,N/A,UNKNOWN\n"
+        "R3,No\n"
+        "R4,No,0123,4\n",
+        encoding='utf-8')
+
+    assert detect_schema(path) == (SCHEMA_INCIDENTS, None)
+    df = read_staging_csv(path)
+
+    assert list(df.columns) == ['report_number', 'hit_run', 'mile_point', 'number_of_lanes']
+    assert list(df['report_number']) == ['R1', 'R2', 'R4']
+    assert df.attrs['bad_lines'] == 1
+    # Text is kept as is, except the missing value tokens
+    assert list(df['mile_point'].iloc[[0, 2]]) == ['1.50', '0123']
+    assert df[['mile_point', 'number_of_lanes']].iloc[1].isna().all()
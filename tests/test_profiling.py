@@ -0,0 +1,23 @@
+import json
+import os
+
+import profiling
+from ingest import read_crash_csv
+from profiling import profile_dataframe, write_dq_report
+
+
+def test_reports_of_files_with_the_same_name_do_not_collide(tmp_path, write_crash_csv, monkeypatch):
+    monkeypatch.setattr(profiling, 'DQ_REPORT_DIR', str(tmp_path / 'reports'))
+    monkeypatch.chdir(tmp_path)
+    paths = []
+    for year, seed in (('2024', 1), ('2025', 2)):
+        os.makedirs(tmp_path / year)
+        source = write_crash_csv(tmp_path / year / 'extract.csv', n=50, seed=seed)
+        paths.append(write_dq_report(str(source), profile_dataframe(read_crash_csv(source)), {}))
+
+    assert paths[0] != paths[1]
+    assert all(os.path.basename(path).startswith('dq_extract_') for path in paths)
+    with open(paths[0], encoding='utf-8') as f:
+        assert json.load(f)['source'].endswith(os.path.join('2024', 'extract.csv'))
+    # The same file reached through another path has the same report
+    assert profiling.dq_report_path(os.path.join('2024', '.', 'extract.csv')) == paths[0]
@@ -0,0 +1,45 @@
+import pytest
+
+import analytical_queries
+import dataWarehouse
+
+QUERIES = {
+    'crash_count': {'number': 1, 'title': 'Crash count', 'database': 'crashDW',
+                    'sql': "SELECT COUNT(*) AS crashes FROM FactCrash"},
+}
+
+
+@pytest.fixture
+def query_cache(warehouse, monkeypatch):
+    monkeypatch.setattr(analytical_queries, 'CACHE_DIR', str(warehouse / 'cache'))
+    monkeypatch.setattr(analytical_queries, 'DW_BACKEND', 'sqlite')
+    monkeypatch.setattr(analytical_queries, 'cache_stats', {'hits': 0, 'misses': 0})
+    yield
+    analytical_queries.close_connections()
+
+
+def crash_count():
+    return int(analytical_queries.run_query('crash_count', queries=QUERIES)['crashes'].iloc[0])
+
+
+def test_cache_is_bypassed_while_loading(query_cache, write_crash_csv, fail_after, monkeypatch):
+    dataWarehouse.main([str(write_crash_csv('january.csv', n=100))])
+    loaded = crash_count()
+    assert crash_count() == loaded
+    assert analytical_queries.cache_stats == {'hits': 1, 'misses': 1}
+
+    # A failed load leaves committed batches behind and no load_id
+    monkeypatch.setattr(dataWarehouse, 'CHECKPOINT_BATCH_SIZE', 20)
+    with monkeypatch.context() as patch:
+        fail_after(patch, 10)
+        with pytest.raises(RuntimeError, match="killed"):
+            dataWarehouse.main([str(write_crash_csv('february.csv', n=100, first=100))])
+    assert analytical_queries.get_load_id(analytical_queries.get_connection('crashDW')) is None
+    partial = crash_count()
+    assert partial > loaded
+    assert analytical_queries.cache_stats == {'hits': 1, 'misses': 1}
+
+    # Resumed and completed: cached again under the new load_id
+    dataWarehouse.main(['february.csv'])
+    assert crash_count() == crash_count() == partial
+    assert analytical_queries.cache_stats == {'hits': 2, 'misses': 2}
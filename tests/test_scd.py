@@ -0,0 +1,154 @@
+import pandas as pd
+import pytest
+
+import backends
+import dataWarehouse
+from backends import connect
+from ingest import read_crash_csv
+from scd import SCD_DIMENSIONS, build_versions, merge_scd_dimension
+from transform import clean_dataframe
+
+BACKENDS = ['sqlite', pytest.param('duckdb', marks=pytest.mark.skipif(
+    backends.duckdb is None, reason="duckdb is not installed"))]
+
+
+def driver_rows(*rows):
+    """Cleaned rows of DimDriver's source columns: (person, crash date, distracted by)"""
+    return pd.DataFrame({
+        'Person ID': [person for person, _, _ in rows],
+        'crash_datetime': pd.to_datetime([date for _, date, _ in rows]),
+        'Driver Substance Abuse': 'NONE DETECTED',
+        'Non-Motorist Substance Abuse': '',
+        'Driver Distracted By': [distracted for _, _, distracted in rows],
+        'Drivers License State': 'MD',
+        'Driver At Fault': 'No',
+    })
+
+
+def test_build_versions():
+    versions = build_versions(driver_rows(
+        ('P1', '2020-03-01 10:00', 'PHONE'),
+        ('P1', '2020-01-01 08:00', 'NOT DISTRACTED'),
+        ('P1', '2020-02-01 09:00', 'NOT DISTRACTED'),
+        ('P2', None, 'PHONE'),
+        ('P2', '2021-01-01 00:00', 'PHONE'),
+    ), 'DimDriver')
+
+    assert versions[['person_id', 'driver_distracted_by', 'effective_from', 'effective_to']].values.tolist() == [
+        ['P1', 'NOT DISTRACTED', '2020-01-01 08:00:00', '2020-03-01 10:00:00'],
+        ['P1', 'PHONE', '2020-03-01 10:00:00', None],
+        # Rows without a date are the oldest
+        ['P2', 'PHONE', '1900-01-01 00:00:00', None],
+    ]
+
+
+@pytest.fixture
+def vehicle_db(warehouse):
+    crash_conn, vehicle_conn = connect('crashDW'), connect('vehicleDW')
+    dataWarehouse.create_all_tables(crash_conn, vehicle_conn)
+    crash_conn.close()
+    yield vehicle_conn
+    vehicle_conn.close()
+
+
+def driver_history(cursor):
+    cursor.execute("""
+        SELECT person_id, driver_distracted_by, effective_from, effective_to, is_current
+        FROM DimDriver ORDER BY person_id, effective_from
+    """)
+    return [(person, distracted, start, end, bool(current)) for person, distracted, start, end, current
+            in cursor.fetchall()]
+
+
+def test_merge_scd_dimension(vehicle_db):
+    cursor = vehicle_db.cursor()
+    assert merge_scd_dimension(cursor, 'DimDriver', driver_rows(
+        ('P1', '2020-01-01 08:00', 'NOT DISTRACTED'),
+        ('P2', '2020-01-05 08:00', 'PHONE'),
+    )) == (2, 0, 0, 0)
+
+    # New versions close the current row; an unchanged key adds nothing
+    assert merge_scd_dimension(cursor, 'DimDriver', driver_rows(
+        ('P1', '2020-06-01 08:00', 'PHONE'),
+        ('P1', '2020-07-01 08:00', 'NOT DISTRACTED'),
+        ('P2', '2020-06-01 08:00', 'PHONE'),
+        ('P3', '2020-06-01 08:00', 'RADIO'),
+    )) == (3, 0, 0, 0)
+    assert driver_history(cursor) == [
+        ('P1', 'NOT DISTRACTED', '2020-01-01 08:00:00', '2020-06-01 08:00:00', False),
+        ('P1', 'PHONE', '2020-06-01 08:00:00', '2020-07-01 08:00:00', False),
+        ('P1', 'NOT DISTRACTED', '2020-07-01 08:00:00', None, True),
+        ('P2', 'PHONE', '2020-01-05 08:00:00', None, True),
+        ('P3', 'RADIO', '2020-06-01 08:00:00', None, True),
+    ]
+
+
+def test_merge_late_rows(vehicle_db):
+    cursor = vehicle_db.cursor()
+    merge_scd_dimension(cursor, 'DimDriver', driver_rows(
+        ('P1', '2020-03-01 08:00', 'NOT DISTRACTED'),
+        ('P1', '2020-09-01 08:00', 'PHONE'),
+    ))
+
+    inserted, late, conflicts, _ = merge_scd_dimension(cursor, 'DimDriver', driver_rows(
+        # Equal to the version that follows: that version starts earlier
+        ('P1', '2020-02-01 08:00', 'NOT DISTRACTED'),
+        # Splits the first version
+        ('P1', '2020-05-01 08:00', 'RADIO'),
+        # Same date as an existing version, other attributes: the existing one wins
+        ('P1', '2020-09-01 08:00', 'FOOD'),
+    ))
+    assert (inserted, late, conflicts) == (0, 1, 1)
+    assert driver_history(cursor) == [
+        ('P1', 'NOT DISTRACTED', '2020-02-01 08:00:00', '2020-05-01 08:00:00', False),
+        ('P1', 'RADIO', '2020-05-01 08:00:00', '2020-09-01 08:00:00', False),
+        ('P1', 'PHONE', '2020-09-01 08:00:00', None, True),
+    ]
+
+
+def load_cleaned(paths):
+    return pd.concat([clean_dataframe(read_crash_csv(path)) for path in paths], ignore_index=True)
+
+
+def check_versions(dbname_query, df):
+    """The dimensions hold the versions of all the rows, and every fact its row's version"""
+    for dimension, spec in SCD_DIMENSIONS.items():
+        key_col, key_src = spec['natural_key']
+        attr_cols = [col for col, _ in spec['attributes']]
+        columns = [key_col] + attr_cols + ['effective_from', 'effective_to']
+
+        expected = build_versions(df, dimension)[columns]
+        stored = pd.DataFrame(dbname_query('vehicleDW', f"SELECT {', '.join(columns)} FROM {dimension}"),
+                              columns=columns)
+        stored = stored.astype(expected.dtypes.to_dict())
+        sort = [key_col, 'effective_from']
+        pd.testing.assert_frame_equal(stored.sort_values(sort).fillna({'effective_to': ''}).reset_index(drop=True),
+                                      expected.sort_values(sort).fillna({'effective_to': ''}).reset_index(drop=True))
+
+        # Each fact references the version whose interval holds its crash date
+        outside = dbname_query('vehicleDW', f"""
+            SELECT COUNT(*)
+            FROM FactVehicleInvolment AS f
+            JOIN {dimension} AS d ON f.{spec['surrogate_key']} = d.{spec['surrogate_key']}
+            JOIN DimDateTime_Veh AS dt ON f.date_key_vehicle = dt.date_key_vehicle
+            WHERE dt.date_value < d.effective_from
+            OR (d.effective_to IS NOT NULL AND dt.date_value >= d.effective_to)
+        """)[0][0]
+        assert outside == 0
+
+
+@pytest.mark.parametrize('backend', BACKENDS)
+@pytest.mark.parametrize('order', [(0, 1), (1, 0)])
+def test_overlapping_extracts_in_any_order(warehouse, write_crash_csv, query, monkeypatch, backend, order):
+    monkeypatch.setattr(backends, 'DW_BACKEND', backend)
+    # Same people and vehicles, crash dates spread over the same years
+    paths = [str(write_crash_csv(warehouse / f"extract_{seed}.csv", n=300, seed=seed, first=300 * seed))
+             for seed in (0, 1)]
+    for number in order:
+        dataWarehouse.main([paths[number]])
+
+    check_versions(query, load_cleaned(paths))
+    current = query('vehicleDW', """
+        SELECT COUNT(*), COUNT(DISTINCT vehicle_id) FROM DimVehicle WHERE is_current
+    """)[0]
+    assert current[0] == current[1]
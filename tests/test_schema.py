@@ -0,0 +1,28 @@
+import pytest
+
+import dataWarehouse
+from backends import connect, list_tables
+
+
+def test_new_databases_are_created_at_the_latest_version(warehouse):
+    crash_conn, vehicle_conn = connect('crashDW'), connect('vehicleDW')
+    dataWarehouse.create_all_tables(crash_conn, vehicle_conn)
+    for dbname, conn in (('crashDW', crash_conn), ('vehicleDW', vehicle_conn)):
+        assert dataWarehouse.get_schema_version(conn, dbname) == dataWarehouse.SCHEMA_MIGRATIONS[dbname][-1]['version']
+        conn.close()
+
+
+def test_original_schema_is_not_modified(warehouse):
+    # FactCrash of the original star schema, before versioning
+    crash_conn, vehicle_conn = connect('crashDW'), connect('vehicleDW')
+    crash_conn.cursor().execute("""
+        CREATE TABLE FactCrash (fact_crash_id SERIAL PRIMARY KEY, report_number TEXT)
+    """)
+    crash_conn.commit()
+
+    with pytest.raises(RuntimeError, match="crashDW is at schema version 0 .* drop the database"):
+        dataWarehouse.create_all_tables(crash_conn, vehicle_conn)
+    assert [table.lower() for table in list_tables(crash_conn)] == ['factcrash']
+    assert list_tables(vehicle_conn) == []
+    crash_conn.close()
+    vehicle_conn.close()
@@ -0,0 +1,53 @@
+import numpy as np
+import pytest
+
+from spatial import (GEOHASH_PRECISIONS, EARTH_RADIUS_KM, geohash_cells_within, geohash_encode,
+                     haversine_km)
+
+
+@pytest.mark.parametrize('latitude, longitude, precision, expected', [
+    # Reference vectors from the geohash specification
+    (57.64911, 10.40744, 11, 'u4pruydqqvj'),
+    (57.64911, 10.40744, 7, 'u4pruyd'),
+    (42.6, -5.6, 5, 'ezs42'),
+])
+def test_geohash_encode_known_vectors(latitude, longitude, precision, expected):
+    assert list(geohash_encode([latitude], [longitude], precision)) == [expected]
+
+
+def test_geohash_encode_missing_coordinates():
+    # NaN and the 0 placeholder left by the cleaners have no cell
+    hashes = geohash_encode([39.0840, np.nan, 0.0], [-77.1528, -77.1528, 0.0], 6)
+    assert list(hashes) == ['dqcnk7', None, None]
+
+
+def points_on_disc(latitude, longitude, radius_km, count=2000, seed=0):
+    """Random points inside and on the edge of a circle, by bearing and distance"""
+    rng = np.random.default_rng(seed)
+    bearing = rng.uniform(0, 2 * np.pi, count)
+    distance = np.concatenate([rng.uniform(0, radius_km, count // 2), np.full(count - count // 2, radius_km)])
+    angular = distance / EARTH_RADIUS_KM
+    lat1, lon1 = np.radians(latitude), np.radians(longitude)
+    lat2 = np.arcsin(np.sin(lat1) * np.cos(angular) + np.cos(lat1) * np.sin(angular) * np.cos(bearing))
+    lon2 = lon1 + np.arctan2(np.sin(bearing) * np.sin(angular) * np.cos(lat1),
+                             np.cos(angular) - np.sin(lat1) * np.sin(lat2))
+    return np.degrees(lat2), np.degrees(lon2)
+
+
+@pytest.mark.parametrize('latitude, longitude, radius_km', [
+    (39.0840, -77.1528, 0.1),
+    (39.0840, -77.1528, 0.5),
+    (39.0840, -77.1528, 2.0),
+    (39.0840, -77.1528, 10.0),
+    # Near a geohash cell border
+    (39.0234375, -77.0800781, 1.0),
+])
+def test_geohash_cells_within_cover_the_circle(latitude, longitude, radius_km):
+    precision, cells = geohash_cells_within(latitude, longitude, radius_km)
+    assert precision in GEOHASH_PRECISIONS
+
+    lats, lons = points_on_disc(latitude, longitude, radius_km)
+    # Stay strictly inside the circle the query filters on
+    inside = haversine_km(latitude, longitude, lats, lons) <= radius_km * (1 - 1e-9)
+    assert inside.sum() > 0
+    assert set(geohash_encode(lats[inside], lons[inside], precision)) <= set(cells)
@@ -0,0 +1,43 @@
+import pytest
+
+import dataWarehouse
+
+
+def write_incidents(path, rows):
+    lines = ["Report Number,Hit/Run,Order,Number of Lanes"]
+    lines += [f"R{number},No,{number + 1},2" for number in range(rows)]
+    path.write_text("\n".join(lines) + "\n", encoding='utf-8')
+    return str(path)
+
+
+def test_reserved_column_names_are_staged(warehouse, query):
+    dataWarehouse.main([write_incidents(warehouse / 'incidents.csv', 3)])
+
+    assert query('crashDW', 'SELECT report_number, "order" FROM Staging_Incidents ORDER BY 2') == [
+        ('R0', '1'), ('R1', '2'), ('R2', '3')]
+
+
+def test_changed_staging_file_replaces_its_rows(warehouse, query):
+    path = write_incidents(warehouse / 'incidents.csv', 3)
+    dataWarehouse.main([path])
+
+    write_incidents(warehouse / 'incidents.csv', 5)
+    dataWarehouse.main([path])
+    assert query('crashDW', "SELECT COUNT(*) FROM Staging_Incidents") == [(5,)]
+    assert query('crashDW', "SELECT row_count FROM etl_checkpoint WHERE stage = 'staging'") == [(5,)]
+
+
+def test_loaded_sources_are_not_prepared_again(warehouse, write_crash_csv, query, monkeypatch):
+    paths = [str(write_crash_csv(warehouse / 'crashes.csv', n=50)),
+             write_incidents(warehouse / 'incidents.csv', 3)]
+    dataWarehouse.main(paths)
+
+    def fail(path, workers=None):
+        raise AssertionError(f"{path} prepared again")
+    monkeypatch.setattr(dataWarehouse, 'prepare_source', fail)
+    dataWarehouse.main(paths)
+
+    # A changed file is still prepared, so its stages can report the change
+    write_incidents(warehouse / 'incidents.csv', 4)
+    with pytest.raises(AssertionError, match="incidents.csv prepared again"):
+        dataWarehouse.main(paths)
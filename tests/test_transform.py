@@ -0,0 +1,28 @@
+import pandas as pd
+import pytest
+
+import transform
+from ingest import read_crash_csv
+
+
+@pytest.fixture
+def raw_crashes(tmp_path, write_crash_csv):
+    return read_crash_csv(write_crash_csv(tmp_path / 'crashes.csv', n=301))
+
+
+@pytest.mark.skipif(not transform.PYARROW_AVAILABLE, reason="pyarrow is not installed")
+def test_ipc_round_trip_keeps_dtypes(raw_crashes):
+    clean_df = transform.clean_dataframe(raw_crashes)
+    for frame in (raw_crashes, clean_df):
+        pd.testing.assert_frame_equal(transform.from_ipc(transform.to_ipc(frame)), frame)
+
+
+@pytest.mark.parametrize('workers', [2, 3])
+def test_parallel_transform_matches_serial(raw_crashes, monkeypatch, workers):
+    expected_df, expected_fact = transform.transform_crash_data(raw_crashes, workers=1)
+
+    monkeypatch.setattr(transform, 'TRANSFORM_PARALLEL_MIN_ROWS', 0)
+    clean_df, fact_crash = transform.transform_crash_data(raw_crashes, workers=workers)
+
+    pd.testing.assert_frame_equal(clean_df, expected_df)
+    pd.testing.assert_frame_equal(fact_crash, expected_fact)